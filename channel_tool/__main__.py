@@ -1,17 +1,30 @@
 #! /usr/bin/env python3
 
 import argparse
+import functools
 import itertools
+import json
+import operator
 import re
 import sys
-from copy import deepcopy
-from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Set, Union
+from copy import copy
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
-from deepdiff import DeepDiff
 from termcolor import colored
 
-import channel_tool.database as db
 from channel_tool.asset_config import (
+    CONFIG_CACHE,
     asset_config_to_string,
     infer_asset_type,
     infer_config_file,
@@ -19,40 +32,55 @@ from channel_tool.asset_config import (
     locate_assets,
     write_asset_config,
 )
-from channel_tool.audit import AuditReport
 from channel_tool.auto_update_utils import create_config_updates, read_history
 from channel_tool.duplicate import DuplicateError, duplicate, gen_channel_id
 from channel_tool.pls_tool import pls_long, pls_lookup, pls_short
-from channel_tool.typedefs import ChannelDefinition, DefsFile, Environment
+from channel_tool.typedefs import (
+    AssetConfig,
+    ChannelDefinition,
+    DefsFile,
+    Environment,
+)
 from channel_tool.util import (
+    DIFF_CONTEXT,
     ENVS,
     GROUND_STATION,
     GS_TEMPLATE_FILE,
     SAT_TEMPLATE_FILE,
+    captured_call,
     confirm,
-    dump_yaml_file,
+    copy_yaml,
     err,
     file_to_yaml_collection,
     file_to_yaml_list,
     file_to_yaml_map,
     find_template,
     format_diff,
+    load_templates,
+    load_templates_fast,
     load_yaml_file,
+    load_yaml_file_fast,
+    parallel_map,
+    replace_file,
     str_to_bool,
     str_to_list,
     str_to_yaml_collection,
     str_to_yaml_list,
     str_to_yaml_map,
     warn,
+    write_templates,
 )
 from channel_tool.validation import (
-    check_element_conforms_to_schema,
+    check_element_conforms_to_validator,
     load_gs_schema,
     load_sat_schema,
+    load_validator,
     validate_all,
 )
 
-CONTACT_TYPE_DEFS: DefsFile = load_yaml_file("contact_type_defs.yaml")
+CONTACT_TYPE_DEFS: DefsFile = load_yaml_file_fast("contact_type_defs.yaml")
+# Listed in the help of every subcommand that takes channels.
+CHANNEL_GROUP_ALIASES = ", ".join(f"'{g}'" for g in CONTACT_TYPE_DEFS["groups"])
 
 
 class AlreadyExistsError(Exception):
@@ -67,24 +95,21 @@ class IncorrectInput(Exception):
     pass
 
 
+@functools.lru_cache(maxsize=1)
 def schema_fields() -> Set[str]:
     """Extract a set of possible field names in the channel JSON schema."""
 
     def discover_keys(s: Union[Dict[str, Any], List[Dict[str, Any]], Any]) -> Set[str]:
         """Extract the transitive closure of map keys from a nested dictionary."""
         keys: Set[str] = set()
-        if isinstance(s, str):
-            pass
-        elif isinstance(s, Sequence):
-            for v in s:
-                keys = keys.union(discover_keys(v))
-        else:
-            try:
-                for k, v in s.items():
-                    keys.add(k)
-                    keys = keys.union(discover_keys(v))
-            except AttributeError:
-                pass
+        stack = [s]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Mapping):
+                keys.update(node.keys())
+                stack.extend(node.values())
+            elif isinstance(node, Sequence) and not isinstance(node, str):
+                stack.extend(node)
         return keys
 
     sat_schema = load_sat_schema()
@@ -97,20 +122,41 @@ def schema_fields() -> Set[str]:
 ListOrDict = Union[Sequence[Any], Mapping[str, Any]]
 
 
+# Concrete container types, which are much cheaper to check than the Sequence ABC. The YAML
+# loaders only ever produce lists and dicts (ruamel's CommentedSeq and CommentedMap subclass them).
+LIST_TYPES = (list, tuple)
+LIST_OR_DICT_TYPES = (list, tuple, dict)
+
+
 def is_list_or_dict(x: Any) -> bool:
-    return isinstance(x, Sequence) or isinstance(x, dict)
+    return isinstance(x, LIST_OR_DICT_TYPES)
+
 
+def merge(a: ListOrDict, b: ListOrDict, in_place: bool = False) -> ListOrDict:
+    """Recursively merge the second argument into the first.
 
-def merge(a: ListOrDict, b: ListOrDict) -> ListOrDict:
-    if isinstance(a, Sequence):
-        assert isinstance(b, Sequence)
-        # Remove duplicate entries. These may be dictionaries, which are unhashable, so we cannot
-        # use a set here. Generally these lists will be quite small so even this inefficient
-        # algorithm is performant enough.
+    Unless `in_place` is set the first argument is left untouched: only the containers along the
+    merged paths are copied, and everything else is shared with the result. Callers which already
+    own a private copy can skip the copies.
+    """
+    if isinstance(a, LIST_TYPES):
+        assert isinstance(b, LIST_TYPES)
+        # Remove duplicate entries, keeping the first occurrence of each. Hashable entries are
+        # looked up in a set. Others, usually dictionaries, can't be, so they're compared with the
+        # ones kept so far; generally there are only a few of them.
         ml = []
+        seen: Set[Any] = set()
+        unhashable: List[Any] = []
         for x in itertools.chain(a, b):
-            if x not in ml:
-                ml.append(x)
+            try:
+                if x in seen:
+                    continue
+                seen.add(x)
+            except TypeError:
+                if x in unhashable:
+                    continue
+                unhashable.append(x)
+            ml.append(x)
 
         if len(ml) > 0 and isinstance(ml[0], str):
             # Special case for lists of strings: sort them
@@ -120,16 +166,16 @@ def merge(a: ListOrDict, b: ListOrDict) -> ListOrDict:
     else:
         assert isinstance(a, dict)
         assert isinstance(b, dict)
-        md = deepcopy(a)
+        md = a if in_place else copy(a)
         for k, v in b.items():
             if k in md and is_list_or_dict(md[k]):
-                md[k] = merge(md[k], v)
+                md[k] = merge(md[k], v, in_place=in_place)
             else:
                 md[k] = v
         return md
 
 
-def remove(a: Any, b: Any) -> Optional[Any]:
+def remove(a: Any, b: Any, in_place: bool = False) -> Optional[Any]:
     """Recursively remove from the first argument all elements from the second.
 
     The deletion proceeds depth-first in a recursive fashion, removing any "leaf" value which
@@ -147,28 +193,42 @@ def remove(a: Any, b: Any) -> Optional[Any]:
 
     If both arguments are atoms -- neither sequences nor dictionaries -- they are compared for
     equality and None is returned if they match.
+
+    As with `merge`, the first argument is only modified if `in_place` is set.
     """
     # For containers, first process recursively and filter out Nones returned by child nodes, then
     # if container is empty return None. Handle strings as atoms.
-    if isinstance(a, Sequence) and not isinstance(a, str):
-        assert isinstance(b, Sequence)
-        retained = []
-        for elt in a:
-            # Only remove elements from sequences that are perfect matches, otherwise if we recurse
-            # we might remove fields from an object that leave it in an invalid state. We almost
-            # never want to do that; we want to remove the whole thing, but only if it's exactly the
-            # item we were looking for.
-            if not any([elt == filt for filt in b]):
-                retained.append(elt)
-        return retained
+    if isinstance(a, LIST_TYPES):
+        assert isinstance(b, LIST_TYPES)
+        # Hashable filters can be matched with a set lookup. The rest (usually dictionaries) have to
+        # be compared one by one, but they can only ever be equal to unhashable elements.
+        hashable_filters = set()
+        other_filters = []
+        for filt in b:
+            try:
+                hashable_filters.add(filt)
+            except TypeError:
+                other_filters.append(filt)
+
+        def matches(elt: Any) -> bool:
+            try:
+                return elt in hashable_filters
+            except TypeError:
+                return any(elt == filt for filt in other_filters)
+
+        # Only remove elements from sequences that are perfect matches, otherwise if we recurse
+        # we might remove fields from an object that leave it in an invalid state. We almost
+        # never want to do that; we want to remove the whole thing, but only if it's exactly the
+        # item we were looking for.
+        return [elt for elt in a if not matches(elt)]
     elif isinstance(a, dict):
         assert isinstance(b, dict)
-        m = deepcopy(a)
+        m = a if in_place else copy(a)
         for k in b.keys():
             if k not in m:
                 continue
 
-            filtered = remove(m[k], b[k])
+            filtered = remove(m[k], b[k], in_place=in_place)
             if filtered:
                 m[k] = filtered
             else:
@@ -189,22 +249,25 @@ EQ = "=="
 NEQ = "!="
 
 comparator_to_lambda = {
-    LTE: lambda curr_value, target_value: curr_value <= target_value,
-    GTE: lambda curr_value, target_value: curr_value >= target_value,
-    LT: lambda curr_value, target_value: curr_value < target_value,
-    GT: lambda curr_value, target_value: curr_value > target_value,
-    EQ: lambda curr_value, target_value: curr_value == target_value,
-    NEQ: lambda curr_value, target_value: curr_value != target_value,
+    LTE: operator.le,
+    GTE: operator.ge,
+    LT: operator.lt,
+    GT: operator.gt,
+    EQ: operator.eq,
+    NEQ: operator.ne,
 }
 
 VALID_COMPARATORS = " ".join(comparator_to_lambda.keys())
 
 
+@functools.lru_cache(maxsize=None)
 def compile_predicate(str_predicate: str) -> Any:
     """
     Takes a single predicate in string form
     "<field_name> <comparator> <target_value>"
     and returns a function which runs the predicate on a config dictionary
+
+    Compiled predicates are memoized, since the same few are applied to every channel.
     """
 
     predicate = str_predicate.split(" ")
@@ -224,10 +287,17 @@ def compile_predicate(str_predicate: str) -> Any:
 
     comparator_func = comparator_to_lambda[comparator]
 
-    def predicate_func(config: Any) -> Optional[Any]:
-        return comparator_func(config[field_name], target_value)
+    # A partial rather than a closure, so that predicates can be sent to worker processes.
+    return functools.partial(check_predicate, field_name, target_value, comparator_func)
+
 
-    return predicate_func
+def check_predicate(
+    field_name: str,
+    target_value: Any,
+    comparator_func: Callable[[Any, Any], Any],
+    config: Any,
+) -> Optional[Any]:
+    return comparator_func(config[field_name], target_value)
 
 
 def update(
@@ -244,35 +314,45 @@ def update(
     for example
     -p min_elevation_deg >= 25 -p downlink_rate_kbps == 300
     """
-    if isinstance(current_config, Sequence):
-        assert isinstance(config_updates, Sequence)
+    if isinstance(current_config, LIST_TYPES):
+        assert isinstance(config_updates, LIST_TYPES)
 
         if all(
             isinstance(n, dict) for n in itertools.chain(current_config, config_updates)
         ):
             config_update = config_updates[0]  # Max one update at a time
-            current_config = list(current_config)
+            if not isinstance(current_config, list):
+                current_config = list(current_config)
+
+            # Fuse the predicates into a single check once, rather than per config.
+            matches: Optional[Callable[[Any], Any]] = None
+            if comparison_functions:
+                if len(comparison_functions) == 1:
+                    matches = comparison_functions[0]
+                else:
+                    predicates = tuple(comparison_functions)
+
+                    def matches(config: Any) -> bool:
+                        return all(p(config) for p in predicates)
+
+            # Fields set to None are left alone, so drop them once rather than for every config.
+            field_updates = [(k, v) for k, v in config_update.items() if v is not None]
 
             for config in current_config:
-                if comparison_functions:
-                    if not all(
-                        comparison_function(config)
-                        for comparison_function in comparison_functions
-                    ):
-                        continue
+                if matches is not None and not matches(config):
+                    continue
 
-                for field_name in config_update:
+                for field_name, value in field_updates:
                     if field_name not in config:
                         continue
 
-                    if config_update[field_name] is None:
-                        continue
-
-                    config[field_name] = update(
-                        config[field_name],
-                        config_update[field_name],
-                        comparison_functions,
-                    )
+                    if is_list_or_dict(config[field_name]):
+                        config[field_name] = update(
+                            config[field_name], value, comparison_functions
+                        )
+                    else:
+                        # Scalars are simply replaced, no need to recurse.
+                        config[field_name] = value
 
             return current_config
 
@@ -282,7 +362,12 @@ def update(
 
         for key in config_updates:
             if key in current_config and config_updates[key]:
-                current_config[key] = update(current_config[key], config_updates[key])
+                if is_list_or_dict(current_config[key]):
+                    current_config[key] = update(
+                        current_config[key], config_updates[key]
+                    )
+                else:
+                    current_config[key] = config_updates[key]
 
         return current_config
 
@@ -294,37 +379,33 @@ def update(
 
 def modify(cdef: ChannelDefinition, args: Any) -> ChannelDefinition:
     """Apply modifications to a channel from argparse arguments."""
-    new_cdef = deepcopy(cdef)
+    # A shallow copy is enough, since the fields below are replaced rather than modified in place.
+    # The exception is the start comment, which lives in metadata that shallow copies share.
+    new_cdef = copy_yaml(cdef) if args.comment else copy(cdef)
     vargs = vars(args)
-    fields = schema_fields()
 
     def get_field_value(field: str) -> Any:
-        if field in vargs and vargs[field] is not None:
-            # Mode is an arg below, but it's also a schema key. We should except this from this functionality.
-            if field != "mode":
-                return vargs[field]
-        arg = f"{field}_file"
-        if arg in vargs and vargs[arg] is not None:
-            return vargs[arg]
-        return None
-
-    for field in fields:
+        val = vargs.get(field)
+        if val is None:
+            val = vargs.get(f"{field}_file")
+        return val
+
+    changes = [
+        (field, val)
+        for field in EDITABLE_FIELDS
+        if (val := get_field_value(field)) is not None
+    ]
+    combine: Callable[[Any, Any], Any] = {
+        "overwrite": lambda current, val: val,
+        "merge": merge,
+        "remove": remove,
+        # Update works in place, so it gets its own copy of the field.
+        "update": lambda current, val: update(copy_yaml(current), val, args.predicate),
+    }[args.mode]
+
+    for field, val in changes:
         try:
-            val = get_field_value(field)
-            if val is not None:
-                if args.mode == "overwrite":
-                    new_cdef[field] = val  # type: ignore
-                elif args.mode == "merge":
-                    new_cdef[field] = merge(cdef.get(field, {}), val)  # type: ignore
-                elif args.mode == "remove":
-                    new_cdef[field] = remove(cdef.get(field, {}), val)  # type: ignore
-                elif args.mode == "update":
-                    new_cdef[field] = update(  # type: ignore
-                        # type: ignore
-                        cdef.get(field, {}),
-                        val,
-                        args.predicate,
-                    )  # type: ignore
+            new_cdef[field] = combine(new_cdef.get(field, {}), val)  # type: ignore
         except Exception as e:
             raise Exception(f"Failed to '{args.mode}' field '{field}'") from e
 
@@ -333,16 +414,18 @@ def modify(cdef: ChannelDefinition, args: Any) -> ChannelDefinition:
     return new_cdef
 
 
-def auto_update(asset: str, cdef: ChannelDefinition, args: Any) -> ChannelDefinition:
+def auto_update(
+    asset: str, cdef: ChannelDefinition, args: Any, history: List[float]
+) -> ChannelDefinition:
     """Create configuration updates and predicates. Then make the updates"""
 
-    new_cdef = deepcopy(cdef)
+    new_cdef = copy_yaml(cdef)
     field = args.parameter
 
-    config_updates = create_config_updates(args, args.history)
+    config_updates = create_config_updates(args, history)
     # filter out low elevation UHF link profiles
     predicates = [compile_predicate("downlink_rate_kbps > 20")]
-    new_cdef[field] = update(cdef[field], config_updates, predicates)  # type: ignore
+    new_cdef[field] = update(new_cdef[field], config_updates, predicates)  # type: ignore
 
     if args.comment:
         new_cdef.yaml_set_start_comment(args.comment)  # type: ignore
@@ -350,89 +433,125 @@ def auto_update(asset: str, cdef: ChannelDefinition, args: Any) -> ChannelDefini
     return new_cdef
 
 
-def add_config(args: Any) -> None:
-    def do_add(
-        asset: str, channel: str, existing: Optional[ChannelDefinition]
-    ) -> ChannelDefinition:
-        if existing is None:
-            asset_type = infer_asset_type(asset)
-            template = find_template(asset_type, channel)
-            return modify(template, args)
+# The transforms below are top-level functions, bound to the arguments with
+# functools.partial, so that apply_update can hand them to worker processes.
+def do_add(
+    args: Any, asset: str, channel: str, existing: Optional[ChannelDefinition]
+) -> ChannelDefinition:
+    if existing is None:
+        asset_type = infer_asset_type(asset)
+        template = find_template(asset_type, channel)
+        return modify(template, args)
+    else:
+        msg = (
+            f"Configuration for {channel} already exists on {asset}.\n"
+            f"(Tip: Use `channel_tool edit {asset} {channel}` to edit the configuration.)"
+        )
+        if not args.fail_fast:
+            warn(msg)
+            return existing
         else:
-            msg = (
-                f"Configuration for {channel} already exists on {asset}.\n"
-                f"(Tip: Use `channel_tool edit {asset} {channel}` to edit the configuration.)"
-            )
-            if not args.fail_fast:
-                warn(msg)
-                return existing
-            else:
-                raise AlreadyExistsError(msg)
+            raise AlreadyExistsError(msg)
 
-    apply_update(args.environment, args.assets, args.channels, do_add, yes=args.yes)
-
-
-def delete_config(args: Any) -> None:
-    def do_delete(
-        asset: str, channel: str, existing: Optional[ChannelDefinition]
-    ) -> None:
-        if existing is None:
-            if args.require_existing:
-                msg = f"No configuration for {channel} on {asset}."
-                if not args.fail_fast:
-                    warn(msg)
-                    return None
-                else:
-                    raise NoConfigurationError(msg)
-        return None
 
-    apply_update(args.environment, args.assets, args.channels, do_delete, yes=args.yes)
+def add_config(args: Any) -> None:
+    apply_update(
+        args.environment,
+        args.assets,
+        args.channels,
+        functools.partial(do_add, args),
+        yes=args.yes,
+        full_diff=args.full_diff,
+        fail_fast=args.fail_fast,
+    )
 
 
-def edit_config(args: Any) -> None:
-    def do_edit(
-        asset: str, channel: str, existing: Optional[ChannelDefinition]
-    ) -> Optional[ChannelDefinition]:
-        if existing is not None:
-            return modify(existing, args)
-        else:
-            msg = (
-                f"No configuration for {channel} on {asset}.\n"
-                f"(Tip: Use `channel_tool add {asset} {channel}` to add one from a template.)"
-            )
+def do_delete(
+    args: Any, asset: str, channel: str, existing: Optional[ChannelDefinition]
+) -> None:
+    if existing is None:
+        if args.require_existing:
+            msg = f"No configuration for {channel} on {asset}."
             if not args.fail_fast:
                 warn(msg)
                 return None
             else:
                 raise NoConfigurationError(msg)
+    return None
 
-    apply_update(args.environment, args.assets, args.channels, do_edit, yes=args.yes)
+
+def delete_config(args: Any) -> None:
+    apply_update(
+        args.environment,
+        args.assets,
+        args.channels,
+        functools.partial(do_delete, args),
+        yes=args.yes,
+        full_diff=args.full_diff,
+        fail_fast=args.fail_fast,
+    )
 
 
-def auto_update_config(args: Any) -> None:
-    def do_auto_update(
-        asset: str, channel: str, existing: Optional[ChannelDefinition]
-    ) -> Optional[ChannelDefinition]:
-        if existing is not None:
-            return auto_update(asset, existing, args)
+def do_edit(
+    args: Any, asset: str, channel: str, existing: Optional[ChannelDefinition]
+) -> Optional[ChannelDefinition]:
+    if existing is not None:
+        return modify(existing, args)
+    else:
+        msg = (
+            f"No configuration for {channel} on {asset}.\n"
+            f"(Tip: Use `channel_tool add {asset} {channel}` to add one from a template.)"
+        )
+        if not args.fail_fast:
+            warn(msg)
+            return None
         else:
-            msg = (
-                f"No configuration for {channel} on {asset}.\n"
-                f"(Tip: Use `channel_tool add {asset} {channel}` to add one from a template.)"
-            )
-            if not args.fail_fast:
-                warn(msg)
-                return None
-            else:
-                raise NoConfigurationError(msg)
+            raise NoConfigurationError(msg)
 
-    history = read_history(args.data_column, args.source_file, args.conversion_factor)
 
-    for channel_id, hist in history.items():
-        args.history = hist
-        apply_update(
-            args.environment, args.assets, [channel_id], do_auto_update, yes=args.yes
+def edit_config(args: Any) -> None:
+    apply_update(
+        args.environment,
+        args.assets,
+        args.channels,
+        functools.partial(do_edit, args),
+        yes=args.yes,
+        full_diff=args.full_diff,
+        fail_fast=args.fail_fast,
+    )
+
+
+def do_auto_update(
+    args: Any, asset: str, channel: str, existing: Optional[ChannelDefinition]
+) -> Optional[ChannelDefinition]:
+    if existing is not None:
+        return auto_update(asset, existing, args, args.history[channel])
+    else:
+        msg = (
+            f"No configuration for {channel} on {asset}.\n"
+            f"(Tip: Use `channel_tool add {asset} {channel}` to add one from a template.)"
         )
+        if not args.fail_fast:
+            warn(msg)
+            return None
+        else:
+            raise NoConfigurationError(msg)
+
+
+def auto_update_config(args: Any) -> None:
+    # Update all the channels in one pass, so that each asset config is read and written once.
+    args.history = read_history(
+        args.data_column, args.source_file, args.conversion_factor
+    )
+    apply_update(
+        args.environment,
+        args.assets,
+        list(args.history),
+        functools.partial(do_auto_update, args),
+        yes=args.yes,
+        full_diff=args.full_diff,
+        fail_fast=args.fail_fast,
+    )
 
 
 def duplicate_config(args: Any) -> None:
@@ -471,17 +590,29 @@ def duplicate_config(args: Any) -> None:
             [existing_channel],
             do_duplicate,
             yes=args.yes,
+            full_diff=args.full_diff,
             new_channel=True,
             args=args,
         )
 
 
 def audit_configs(args: Any) -> None:
+    # Imported here since it pulls in requests, which other commands don't need.
+    from channel_tool.audit import audit_report, preload_assets
+
     sats = locate_assets(args.environment, args.satellites)
     gss = locate_assets(args.environment, args.ground_stations)
-    for sat, gs in itertools.product(sats, gss):
-        report = AuditReport(args.environment, sat, gs)
-        if report.shared or not args.matches_only:
+    preload_assets(args.environment, sats, gss)
+    pairs = list(itertools.product(sats, gss))
+    reports = parallel_map(
+        audit_report,
+        itertools.repeat(args.environment),
+        [sat for sat, _ in pairs],
+        [gs for _, gs in pairs],
+        itertools.repeat(args.matches_only),
+    )
+    for report in reports:
+        if report is not None:
             print(report)
 
 
@@ -498,30 +629,56 @@ def query_configs(args: Any) -> None:
 
 
 def diff_configs(args: Any) -> None:
-    assets_dict = {}
-    for env in args.environment.split(","):
-        for asset in locate_assets(env, args.assets):
-            asset_config = load_asset_config(env, asset)
-            # assets_dict[env] = {asset: asset_config}
-            assets_dict[f"{env}-{asset}"] = asset_config
-
-    for permutation in itertools.combinations(assets_dict.keys(), 2):
-        diff = DeepDiff(
-            assets_dict[permutation[0]],
-            assets_dict[permutation[1]],
-            ignore_order=True,
-            verbose_level=args.verbose,
+    assets = [
+        (env, asset)
+        for env in args.environment.split(",")
+        for asset in locate_assets(env, args.assets)
+    ]
+    # Serialize every config once, so that identical pairs can skip DeepDiff entirely.
+    canonical = {
+        (env, asset): json.dumps(
+            load_asset_config(env, asset), sort_keys=True, default=str
         )
-        out = f"Difference between {permutation[0]} and {permutation[1]}"
+        for env, asset in assets
+    }
+
+    pairs = list(itertools.combinations(canonical.keys(), 2))
+    differing = [(a, b) for a, b in pairs if canonical[a] != canonical[b]]
+    diffs = parallel_map(
+        diff_report,
+        [a for a, _ in differing],
+        [b for _, b in differing],
+        itertools.repeat(args.verbose),
+    )
+
+    for a, b in pairs:
+        diff = next(diffs) if canonical[a] != canonical[b] else None
+        out = f"Difference between {'-'.join(a)} and {'-'.join(b)}"
         sep = "=" * len(out)
         out = "\n" + out + "\n" + sep + "\n"
         print(out)
         if diff:  # if diff is not empty
-            print(f"{diff.pretty()}\n")
+            print(f"{diff}\n")
         else:
             print("None\n")
 
 
+def diff_report(
+    a: Tuple[Environment, str], b: Tuple[Environment, str], verbose: int
+) -> Optional[str]:
+    # Imported here since it is slow to import and only needed for diffs.
+    from deepdiff import DeepDiff
+
+    diff = DeepDiff(
+        load_asset_config(*a),
+        load_asset_config(*b),
+        ignore_order=True,
+        verbose_level=verbose,
+    )
+    report: Optional[str] = diff.pretty() if diff else None
+    return report
+
+
 def normalize_configs(args: Any) -> None:
     for asset in locate_assets(args.environment, args.assets):
         config = load_asset_config(args.environment, asset)
@@ -535,12 +692,18 @@ def format_configs(args: Any) -> None:
     sat_templates = load_yaml_file(SAT_TEMPLATE_FILE)
     pass_check = format_asset(args, sat_templates, SAT_TEMPLATE_FILE) and pass_check
     for env in ENVS:
-        all_assets = locate_assets(env, "all_gs")
-        all_assets.extend(locate_assets(env, "all_sat"))
-        for asset in sorted(all_assets):
-            path = infer_config_file(env, asset)
-            config = load_asset_config(env, asset)
-            pass_check = format_asset(args, config, path) and pass_check
+        all_assets = locate_assets(env, "all")
+        results = parallel_map(
+            functools.partial(captured_call, format_asset_file),
+            itertools.repeat(args),
+            itertools.repeat(env),
+            sorted(all_assets),
+        )
+        for passed, output, error in results:
+            print(output, end="")
+            if error is not None:
+                raise error
+            pass_check = passed and pass_check
     if args.check and not pass_check:
         print(
             "Use the channel_tool 'format' or 'normalize' commands to correct non-standard formatting"
@@ -555,7 +718,7 @@ def duplicate_template(new_channel_id: str, old_channel_id: str, asset: str) ->
         else SAT_TEMPLATE_FILE
     )
 
-    templates = load_yaml_file(file)
+    templates = load_templates(file)
 
     if new_channel_id in templates:
         warn(f"{new_channel_id} already exists in {file}. No-op.")
@@ -568,8 +731,8 @@ def duplicate_template(new_channel_id: str, old_channel_id: str, asset: str) ->
     )
     new_template = duplicate(args, old_template, template_class_annos)
 
-    templates[new_channel_id] = deepcopy(new_template)
-    dump_yaml_file(templates, file)
+    templates[new_channel_id] = copy_yaml(new_template)
+    write_templates(templates, file)
 
     print(f"Added {new_channel_id} to {file}.")
 
@@ -587,32 +750,51 @@ def rename_channel(args: Any) -> None:
         sat_templates, SAT_TEMPLATE_FILE, current_name, new_name
     )
     for env in ENVS:
-        all_assets = locate_assets(env, "all_gs")
-        all_assets.extend(locate_assets(env, "all_sat"))
-        for asset in all_assets:
-            path = infer_config_file(env, asset)
-            configs = load_asset_config(env, asset)
-            any_updates |= rename_channel_in_configs(
-                configs, path, current_name, new_name
-            )
+        all_assets = locate_assets(env, "all")
+        results = parallel_map(
+            functools.partial(captured_call, rename_channel_in_asset),
+            itertools.repeat(env),
+            all_assets,
+            itertools.repeat(current_name),
+            itertools.repeat(new_name),
+        )
+        for asset, (renamed, output, error) in zip(all_assets, results):
+            print(output, end="")
+            # The asset file may have been rewritten by a worker.
+            CONFIG_CACHE.pop((env, asset), None)
+            if error is not None:
+                raise error
+            any_updates |= renamed
     if not any_updates:
         print(f"No channel {current_name} found in any config or template")
 
 
+def rename_channel_in_asset(
+    env: Environment, asset: str, current_name: str, new_name: str
+) -> bool:
+    path = infer_config_file(env, asset)
+    configs = load_asset_config(env, asset)
+    return rename_channel_in_configs(configs, path, current_name, new_name)
+
+
 def rename_channel_in_configs(
     configs: Any, path: str, current_name: str, new_name: str
 ) -> bool:
     config = configs.pop(current_name, None)
     if config:
         configs[new_name] = config
-        configs_string = asset_config_to_string(configs)
-        with open(path, "w") as f:
-            f.write(configs_string)
+        replace_file(path, asset_config_to_string(configs))
         print(f"Renamed channel {current_name} to {new_name} in {path}")
         return True
     return False
 
 
+def format_asset_file(args: Any, env: Environment, asset: str) -> bool:
+    path = infer_config_file(env, asset)
+    config = load_asset_config(env, asset)
+    return format_asset(args, config, path)
+
+
 def format_asset(args: Any, config: Any, path: str) -> bool:
     with open(path) as f:
         string_before = f.read()
@@ -626,8 +808,7 @@ def format_asset(args: Any, config: Any, path: str) -> bool:
             print(f"Formatting {path}: file would be updated")
         else:
             print(f"Formatting {path}: updated")
-            with open(path, "w") as f:
-                f.write(string_after)
+            replace_file(path, string_after)
         return False
 
 
@@ -637,72 +818,137 @@ def apply_update(
     channels: List[str],
     tfm: Callable[[str, str, Optional[ChannelDefinition]], Optional[ChannelDefinition]],
     yes: bool = False,
+    full_diff: bool = False,
     new_channel: Optional[bool] = False,
     args: Optional[Any] = None,
+    fail_fast: bool = False,
 ) -> None:
-    for asset in locate_assets(env, assets):
-        asset_config = load_asset_config(env, asset)
-        for channel in channels:
-            existing_chan = asset_config.get(channel)
-            try:
-                updated_chan = tfm(asset, channel, existing_chan)
-
-                if updated_chan is not None:
-                    # new_channel is specified when we operated on an existing
-                    # channel but want to save our changes under a new id. We
-                    # need to update existing_chan so that the diff is correct
-                    # and channel so that we use the new channel id from here
-                    # on.
-                    if new_channel:
-                        # This is going to run many times so let's avoid file i/o when we can
-                        class_annos = updated_chan.get(
-                            "classification_annotations"
-                        ) or find_template(GROUND_STATION, channel).get(
-                            "classification_annotations"
-                        )
-                        new_channel_id = gen_channel_id(args, class_annos)
-                        existing_chan = None
-                        old_channel_id = channel
-                        channel = new_channel_id
-
-                    asset_type = infer_asset_type(asset)
-                    check_element_conforms_to_schema(
-                        asset_type, updated_chan, file=asset, key=channel
+    asset_ids = locate_assets(env, assets)
+    if yes and not new_channel and not fail_fast and len(asset_ids) > 1:
+        # Without confirmation prompts the assets are independent of each other, so
+        # work out their updates in worker processes. Nothing is written until all of
+        # them are done; then the results are gone through in order, just like the
+        # serial path would, stopping at the first asset which failed.
+        results = list(
+            parallel_map(
+                functools.partial(captured_call, updated_asset_config),
+                itertools.repeat(env),
+                asset_ids,
+                itertools.repeat(channels),
+                itertools.repeat(tfm),
+                itertools.repeat(True),
+            )
+        )
+        try:
+            for asset, (asset_config, output, error) in zip(asset_ids, results):
+                print(output, end="")
+                if error is not None:
+                    raise error
+                if asset_config is not None:
+                    write_asset_config(env, asset, asset_config)
+        finally:
+            # The workers updated copies of the configs, so reload them when needed here.
+            for asset in asset_ids:
+                CONFIG_CACHE.pop((env, asset), None)
+    else:
+        for asset in asset_ids:
+            update_asset(env, asset, channels, tfm, yes, full_diff, new_channel, args)
+
+
+def update_asset(
+    env: Environment,
+    asset: str,
+    channels: List[str],
+    tfm: Callable[[str, str, Optional[ChannelDefinition]], Optional[ChannelDefinition]],
+    yes: bool = False,
+    full_diff: bool = False,
+    new_channel: Optional[bool] = False,
+    args: Optional[Any] = None,
+) -> None:
+    asset_config = updated_asset_config(
+        env, asset, channels, tfm, yes, full_diff, new_channel, args
+    )
+    if asset_config is not None:
+        write_asset_config(env, asset, asset_config)
+
+
+def updated_asset_config(
+    env: Environment,
+    asset: str,
+    channels: List[str],
+    tfm: Callable[[str, str, Optional[ChannelDefinition]], Optional[ChannelDefinition]],
+    yes: bool = False,
+    full_diff: bool = False,
+    new_channel: Optional[bool] = False,
+    args: Optional[Any] = None,
+) -> Optional[AssetConfig]:
+    """Apply the updates to an asset's config, returning it if anything changed."""
+    asset_config = load_asset_config(env, asset)
+    validator = load_validator(infer_asset_type(asset))
+    # Only write the config back if a channel actually changed, since dumping it is costly.
+    dirty = False
+    for channel in channels:
+        existing_chan = asset_config.get(channel)
+        try:
+            updated_chan = tfm(asset, channel, existing_chan)
+
+            if updated_chan is not None:
+                # new_channel is specified when we operated on an existing
+                # channel but want to save our changes under a new id. We
+                # need to update existing_chan so that the diff is correct
+                # and channel so that we use the new channel id from here
+                # on.
+                if new_channel:
+                    # This is going to run many times so let's avoid file i/o when we can
+                    class_annos = updated_chan.get(
+                        "classification_annotations"
+                    ) or find_template(GROUND_STATION, channel).get(
+                        "classification_annotations"
                     )
+                    new_channel_id = gen_channel_id(args, class_annos)
+                    existing_chan = None
+                    old_channel_id = channel
+                    channel = new_channel_id
 
-                if updated_chan != existing_chan:
-                    if yes or confirm_changes(
-                        asset, channel, existing_chan, updated_chan
-                    ):
-                        if updated_chan is None:
-                            try:
-                                del asset_config[channel]
-                                print(f"Deleted {channel} definition for {asset}.")
-                            except KeyError:
-                                pass
-                        else:
-                            # Deepcopy here to try to avoid YAML being too smart and combining
-                            # structures. It makes diffs hard to read.
-                            updated_chan = deepcopy(updated_chan)
-                            asset_config[channel] = updated_chan
-                            print(f"Updated {channel} definition for {asset}.")
-
-                            # If we're creating a new channel, also add it to
-                            # the templates
-                            if new_channel:
-                                duplicate_template(channel, old_channel_id, asset)
-                else:
-                    print(colored(f"No changes for {channel} on {asset}.", "magenta"))
-            except AlreadyExistsError as e:
-                err(f"Error: {e}")
-            except DuplicateError as e:
-                err(f"Error: {e}")
-            except Exception as e:
-                err(
-                    f"Unhandled exception with asset {asset} and channel {channel} : {e}"
+                check_element_conforms_to_validator(
+                    validator, updated_chan, file=asset, key=channel
                 )
-                raise
-        write_asset_config(env, asset, asset_config)
+
+            # Transforms that change nothing usually hand back the existing channel itself, so check
+            # identity before falling back to a deep comparison.
+            if updated_chan is not existing_chan and updated_chan != existing_chan:
+                if yes or confirm_changes(
+                    asset, channel, existing_chan, updated_chan, full_diff
+                ):
+                    if updated_chan is None:
+                        try:
+                            del asset_config[channel]
+                            dirty = True
+                            print(f"Deleted {channel} definition for {asset}.")
+                        except KeyError:
+                            pass
+                    else:
+                        # No need to copy here: the transforms return fresh channels, and
+                        # the YAML dumper never writes structures shared between channels
+                        # as aliases.
+                        asset_config[channel] = updated_chan
+                        dirty = True
+                        print(f"Updated {channel} definition for {asset}.")
+
+                        # If we're creating a new channel, also add it to
+                        # the templates
+                        if new_channel:
+                            duplicate_template(channel, old_channel_id, asset)
+            else:
+                print(colored(f"No changes for {channel} on {asset}.", "magenta"))
+        except AlreadyExistsError as e:
+            err(f"Error: {e}")
+        except DuplicateError as e:
+            err(f"Error: {e}")
+        except Exception as e:
+            err(f"Unhandled exception with asset {asset} and channel {channel} : {e}")
+            raise
+    return asset_config if dirty else None
 
 
 def confirm_changes(
@@ -710,11 +956,12 @@ def confirm_changes(
     channel: str,
     existing: Optional[ChannelDefinition],
     new: Optional[ChannelDefinition],
+    full_diff: bool = False,
 ) -> bool:
     ch = colored(channel, attrs=["bold"])
     at = colored(asset, attrs=["bold"])
     print(f"Changing {ch} on {at}. Diff:")
-    print(format_diff(existing, new))
+    print(format_diff(existing, new, context=None if full_diff else DIFF_CONTEXT))
     if confirm("Update asset configuration?"):
         return True
     else:
@@ -722,31 +969,52 @@ def confirm_changes(
         return False
 
 
-def channel_list(val: str) -> List[str]:
-    sat_templates: Dict[str, ChannelDefinition] = load_yaml_file(SAT_TEMPLATE_FILE)
-    gs_templates: Dict[str, ChannelDefinition] = load_yaml_file(GS_TEMPLATE_FILE)
-    all_channels = list(set(sat_templates.keys()).union(set(gs_templates.keys())))
+@functools.lru_cache(maxsize=1)
+def classification_annotations_schema() -> Dict[str, Any]:
     gs_schema = load_gs_schema()
-    classification_annotations_schema: dict[str, Any] = gs_schema["properties"][
-        "classification_annotations"
-    ]["properties"]
-
-    # Matches a string if it contains classification annotation keys
-    # Used to figure out if the input is a predicate
-    classification_annotations_keys = list(classification_annotations_schema.keys())
-    regex = re.compile(f".*(?=({'|'.join(classification_annotations_keys)}))")
-
-    if val.lower() == "all":
-        return all_channels
-    elif val.lower() in CONTACT_TYPE_DEFS["groups"]:
-        group_predicate = CONTACT_TYPE_DEFS["groups"][val.lower()]
-        return channels_from_predicate(
-            group_predicate, gs_templates, classification_annotations_schema
-        )
-    elif regex.match(val):
-        return channels_from_predicate(
-            val, gs_templates, classification_annotations_schema
+    schema: Dict[str, Any] = gs_schema["properties"]["classification_annotations"][
+        "properties"
+    ]
+    return schema
+
+
+@functools.lru_cache(maxsize=1)
+def predicate_regex() -> re.Pattern[str]:
+    """Matches a string if it contains classification annotation keys.
+
+    Used to figure out if the input is a predicate.
+    """
+    keys = classification_annotations_schema().keys()
+    return re.compile(f".*(?=({'|'.join(map(re.escape, keys))}))")
+
+
+@functools.lru_cache(maxsize=1)
+def all_channels() -> Sequence[str]:
+    sat_templates = load_templates_fast(SAT_TEMPLATE_FILE)
+    gs_templates = load_templates_fast(GS_TEMPLATE_FILE)
+    return tuple(sat_templates.keys() | gs_templates.keys())
+
+
+@functools.lru_cache(maxsize=None)
+def channels_matching(predicate: str) -> Sequence[str]:
+    """The ground station template channels whose annotations match a predicate."""
+    return tuple(
+        channels_from_predicate(
+            predicate,
+            load_templates_fast(GS_TEMPLATE_FILE),
+            classification_annotations_schema(),
         )
+    )
+
+
+def channel_list(val: str) -> List[str]:
+    key = val.lower()
+    if key == "all":
+        return list(all_channels())
+    elif key in CONTACT_TYPE_DEFS["groups"]:
+        return list(channels_matching(CONTACT_TYPE_DEFS["groups"][key]))
+    elif predicate_regex().match(val):
+        return list(channels_matching(val))
     else:
         channels: List[str] = str_to_list(val)
         return channels
@@ -760,12 +1028,17 @@ def channels_from_predicate(
     # Don't need the giant stack trace if this fails. Just give us the error message.
     sys.tracebacklimit = -1
     # Check that we can evaluate the predicate against the classification
-    # annotations schema which means it doesn't contain any invalid keys
-    eval(val, classification_annotations_schema)
+    # annotations schema which means it doesn't contain any invalid keys. Copy the schema, since
+    # eval adds __builtins__ to the globals it is given. The predicate is compiled once up front,
+    # since it is evaluated against every template.
+    code = compile(val, "<predicate>", "eval")
+    eval(code, dict(classification_annotations_schema))
     # Reset back to the default
     # https://docs.python.org/3/library/sys.html#sys.tracebacklimit
     sys.tracebacklimit = 1000
 
+    blank_namespace = dict.fromkeys(classification_annotations_schema.keys())
+
     def evaluate(annos: Dict[str, Any]) -> Any:
         # Add missing keys to the annotations and set them to None
         # This allows us to run predicates that contain keys that doesn't
@@ -773,10 +1046,10 @@ def channels_from_predicate(
         # keys as exceptions. So this allows us to run predicates like:
         # (not space_ground_sband_mid_freq_mhz or space_ground_sband_mid_freq_mhz == 2022.5)
         # which would otherwise raise `NameError` for XBand channels.
-        for key in classification_annotations_schema.keys() - annos.keys():
-            annos[key] = None
-
-        return eval(val, annos)
+        # Evaluate in a fresh namespace, since the templates are shared and must not be modified.
+        namespace = dict(blank_namespace)
+        namespace.update(annos)
+        return eval(code, namespace)
 
     return [
         id
@@ -785,6 +1058,16 @@ def channels_from_predicate(
     ]
 
 
+def run_db_command(args: Any) -> None:
+    # Imported here since it loads the license definitions, which other commands don't need.
+    import channel_tool.database as db
+
+    if args.db_command == "ingest":
+        db.ingest_assets(args.environment, args.assets)
+    else:
+        getattr(db, args.db_command)()
+
+
 def add_process_flags(parser: Any) -> None:
     """Flags modulating the editing process."""
     parser.add_argument(
@@ -799,6 +1082,11 @@ def add_process_flags(parser: Any) -> None:
         action="store_true",
         help="Do not continue with further edits after errors.",
     )
+    parser.add_argument(
+        "--full-diff",
+        action="store_true",
+        help="Show the whole channel definition when confirming edits, not just the changed lines.",
+    )
     parser.add_argument(
         "-c",
         "--comment",
@@ -817,6 +1105,25 @@ def add_delete_flags(parser: Any) -> None:
     )
 
 
+# The channel definition fields which have editing flags below. Each may also be given as a file
+# through a flag with a "_file" suffix.
+EDITABLE_FIELDS = (
+    "directionality",
+    "contact_type",
+    "allowed_license_countries",
+    "enabled",
+    "legal",
+    "contact_overhead_time",
+    "ground_station_constraints",
+    "satellite_constraints",
+    "link_profile",
+    "window_parameters",
+    "dynamic_window_parameters",
+    "classification_annotations",
+    "additional_provider_config",
+)
+
+
 def add_editing_flags(parser: Any) -> None:
     """Add flags for each channel definition field. Used for editing and overrides."""
     # Meta
@@ -965,7 +1272,6 @@ def add_asset_flag(parser: Any) -> None:
 
 
 def add_channel_flag(parser: Any) -> None:
-    aliases = ", ".join([f"'{g}'" for g in CONTACT_TYPE_DEFS["groups"].keys()])
     parser.add_argument(
         "channels",
         type=channel_list,
@@ -989,7 +1295,7 @@ def add_channel_flag(parser: Any) -> None:
             "'(directionality == 'BIDIR' and not can_run_rpcs) or \n"
             "space_ground_sband_dvbs2x_pls == 39'\n\n"
             "For more examples, see the groups in contact_type_defs.yaml.\n\n"
-            f"3) The following aliases: {aliases} or 'all'.\n"
+            f"3) The following aliases: {CHANNEL_GROUP_ALIASES} or 'all'.\n"
         ),
     )
 
@@ -1312,24 +1618,24 @@ DATABASE_SUBPARSERS = DATABASE_PARSER.add_subparsers()
 DATABASE_INIT_PARSER = DATABASE_SUBPARSERS.add_parser(
     "init", help="Create a new SQLite database with existing data"
 )
-DATABASE_INIT_PARSER.set_defaults(func=lambda _: db.init())
+DATABASE_INIT_PARSER.set_defaults(func=run_db_command, db_command="init")
 
 DATABASE_SAMPLE_PARSER = DATABASE_SUBPARSERS.add_parser(
     "load-samples", help="Load sample data into the database"
 )
-DATABASE_SAMPLE_PARSER.set_defaults(func=lambda _: db.load_sample_data())
+DATABASE_SAMPLE_PARSER.set_defaults(func=run_db_command, db_command="load_sample_data")
 
 DATABASE_LICENSE_PARSER = DATABASE_SUBPARSERS.add_parser(
     "load-licenses", help="Load license data from YAML into the database"
 )
-DATABASE_LICENSE_PARSER.set_defaults(func=lambda _: db.load_license_data())
+DATABASE_LICENSE_PARSER.set_defaults(
+    func=run_db_command, db_command="load_license_data"
+)
 
 DATABASE_INGEST_PARSER = DATABASE_SUBPARSERS.add_parser(
     "ingest", help="Ingest a configuration file for a given asset into the database"
 )
-DATABASE_INGEST_PARSER.set_defaults(
-    func=lambda args: db.ingest_assets(args.environment, args.assets)
-)
+DATABASE_INGEST_PARSER.set_defaults(func=run_db_command, db_command="ingest")
 add_env_flag(DATABASE_INGEST_PARSER)
 add_asset_flag(DATABASE_INGEST_PARSER)
 
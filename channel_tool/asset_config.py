@@ -1,5 +1,5 @@
+import functools
 import os
-from copy import deepcopy
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ruamel.yaml.comments import CommentedMap
@@ -20,25 +20,33 @@ from channel_tool.util import (
     dump_yaml_file,
     dump_yaml_string,
     load_yaml_file,
+    load_yaml_file_fast,
+    yaml_file_names,
 )
 
 CONFIG_CACHE: Dict[Tuple[str, str], AssetConfig] = {}
 
 
-def locate_assets(env: Environment, assets: Union[str, List[str]]) -> List[str]:
-    def name(p: str) -> str:
-        return os.path.splitext(os.path.basename(p))[0]
+@functools.lru_cache(maxsize=1)
+def load_asset_groups() -> Dict[str, List[str]]:
+    assetGroups: Dict[str, List[str]] = load_yaml_file_fast("asset_groups.yaml")
+    return assetGroups
+
 
+def locate_assets(env: Environment, assets: Union[str, List[str]]) -> List[str]:
     def group(g: str) -> Optional[List[str]]:
-        assetGroups: Dict[str, List[str]] = load_yaml_file("asset_groups.yaml")
-        return assetGroups.get(g)
+        # Copy, since callers may extend the list they get back.
+        asset_group = load_asset_groups().get(g)
+        return list(asset_group) if asset_group is not None else None
 
     if isinstance(assets, list):
         return assets
     elif assets == "all_gs":
-        return sorted([name(p) for p in os.listdir(os.path.join(env, GS_DIR))])
+        gss: List[str] = yaml_file_names(os.path.join(env, GS_DIR))
+        return gss
     elif assets == "all_sat":
-        return sorted([name(p) for p in os.listdir(os.path.join(env, SAT_DIR))])
+        sats: List[str] = yaml_file_names(os.path.join(env, SAT_DIR))
+        return sats
     elif assets == "all":
         vs = locate_assets(env, "all_gs")
         vs.extend(locate_assets(env, "all_sat"))
@@ -94,6 +102,8 @@ def write_asset_config(env: Environment, asset: str, asset_config: AssetConfig)
         dump_yaml_file(asset_config, config_file)
     elif os.path.exists(config_file):
         os.remove(config_file)
+    # Keep the cache in step with the file, so that it doesn't need to be parsed again.
+    CONFIG_CACHE[(env, asset)] = asset_config
 
 
 def asset_config_to_string(asset_config: AssetConfig) -> str:
@@ -103,8 +113,9 @@ def asset_config_to_string(asset_config: AssetConfig) -> str:
 
 
 def normalize_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
-    """Normalize a configuration file by removing anchors and sorting keys."""
-    new_config: Dict[str, Any] = CommentedMap()
-    for k in sorted(cfg):
-        new_config[k] = deepcopy(cfg[k])
+    """Normalize a configuration file by sorting keys.
+
+    Anchors are never written out, since the YAML dumper is configured to ignore aliases.
+    """
+    new_config: Dict[str, Any] = CommentedMap((k, cfg[k]) for k in sorted(cfg))
     return new_config
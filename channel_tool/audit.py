@@ -1,6 +1,9 @@
+import pickle
 from itertools import chain, zip_longest
-from typing import Any, List, Optional, Tuple
+from operator import itemgetter
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
 
+from tabulate import _type as tabulate_cell_type  # type: ignore
 from tabulate import tabulate
 from termcolor import colored
 
@@ -13,7 +16,67 @@ from channel_tool.typedefs import (
     TkGroundStation,
     TkSatellite,
 )
-from channel_tool.util import GROUND_STATION, SATELLITE, dump_yaml_string, lookup
+from channel_tool.util import GROUND_STATION, SATELLITE, dump_yaml_string
+
+# Memoize the allowed license countries of each asset's channels as sets, since every asset is
+# usually audited against many others.
+ALLOWED_COUNTRIES_CACHE: Dict[Tuple[str, str], Dict[str, FrozenSet[str]]] = {}
+
+# Memoize the YAML rendering of merged window parameters, by their pickled value.
+MERGED_PARAMS_YAML: Dict[bytes, str] = {}
+
+
+def normalize_license_country(country: str) -> str:
+    return country[:2]
+
+
+def is_plain_cell(cell: Optional[str]) -> bool:
+    if cell is None:
+        return True
+    # Control characters cover line breaks, tabs and the escapes in colored text.
+    if not (cell.isascii() and cell.isprintable()) or cell != cell.strip():
+        return False
+    # Leave anything tabulate would parse (numbers, with or without separators, and bools) to it.
+    return cell == "" or tabulate_cell_type(cell, has_invisible=False) is str
+
+
+def simple_table(rows: List[List[Optional[str]]], headers: List[str]) -> str:
+    """Render a table in tabulate's "simple" format.
+
+    Used for the rejected channels of audit reports, whose cells are channel names and reasons.
+    Only plain one-line text is laid out here; anything tabulate would align, strip or measure
+    differently (numbers, padded, multi-line or wide text, ANSI colors) is handed to tabulate.
+    """
+    if not all(is_plain_cell(c) for row in rows for c in row):
+        table: str = tabulate(rows, headers)
+        return table
+    cells = [headers, *[[c or "" for c in row] for row in rows]]
+    widths = [len(h) + 2 for h in headers]
+    for row in cells:
+        for i, c in enumerate(row):
+            if len(c) > widths[i]:
+                widths[i] = len(c)
+    lines = [
+        "  ".join(c.ljust(w) for c, w in zip(row, widths)).rstrip() for row in cells
+    ]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+
+def allowed_countries(config: AssetConfig) -> Dict[str, FrozenSet[str]]:
+    return {
+        chan: frozenset(cdef.get("allowed_license_countries", ()))
+        for chan, cdef in config.items()
+        if cdef is not None
+    }
+
+
+def load_allowed_countries(env: Environment, asset: str) -> Dict[str, FrozenSet[str]]:
+    if (env, asset) not in ALLOWED_COUNTRIES_CACHE:
+        ALLOWED_COUNTRIES_CACHE[(env, asset)] = allowed_countries(
+            load_asset_config(env, asset)
+        )
+    return ALLOWED_COUNTRIES_CACHE[(env, asset)]
 
 
 def channel_rejection_reason(
@@ -21,8 +84,17 @@ def channel_rejection_reason(
     ground_station: TkGroundStation,
     sat_chan: Optional[ChannelDefinition],
     gs_chan: Optional[ChannelDefinition],
+    sat_country: str,
+    gs_country: str,
+    sat_allowed_countries: FrozenSet[str],
+    gs_allowed_countries: FrozenSet[str],
 ) -> Optional[str]:
-    """Apply channel matching rules and return the reason for mismatch, if any."""
+    """Apply channel matching rules and return the reason for mismatch, if any.
+
+    The license countries of the satellite and ground station are passed in already normalized,
+    since they are the same for every channel of the pair, along with each channel's allowed
+    license countries as a set.
+    """
     if gs_chan is None:
         return "Channel not configured on ground station"
 
@@ -54,20 +126,19 @@ def channel_rejection_reason(
     sat_countries = sat_chan["allowed_license_countries"]
     gs_countries = gs_chan["allowed_license_countries"]
 
-    def normalize(country: str) -> str:
-        return country[:2]
-
-    sat_country = normalize(satellite["license_country"])
-    gs_country = ground_station["license_country"]
-
-    if sat_country not in gs_countries:
+    if sat_country not in gs_allowed_countries:
         return f"Satellite license country {sat_country} not in set {gs_countries}"
 
-    if gs_country not in sat_countries:
+    if gs_country not in sat_allowed_countries:
         return f"Ground station license country {gs_country} not in set {sat_countries}"
 
-    denied_gss = lookup("satellite_constraints.deny_ground_stations", sat_chan)
-    denied_sats = lookup("ground_station_constraints.deny_satellites", gs_chan)
+    # Most channels have no constraints at all, so look the deny lists up directly.
+    sat_constraints = sat_chan.get("satellite_constraints")
+    denied_gss = (
+        sat_constraints.get("deny_ground_stations") if sat_constraints else None
+    )
+    gs_constraints = gs_chan.get("ground_station_constraints")
+    denied_sats = gs_constraints.get("deny_satellites") if gs_constraints else None
 
     if denied_sats and satellite["spire_id"] in denied_sats:
         return "Satellite in ground station deny list"
@@ -84,17 +155,36 @@ def compare_channels(
     satellite: TkSatellite,
     ground_station: TkGroundStation,
     inspections: List[Any],
+    sat_allowed_countries: Optional[Mapping[str, FrozenSet[str]]] = None,
+    gs_allowed_countries: Optional[Mapping[str, FrozenSet[str]]] = None,
 ) -> Tuple[List[List[Optional[str]]], List[List[Optional[str]]]]:
     """Compare the configured channels for the given satellite and ground station."""
+    if sat_allowed_countries is None:
+        sat_allowed_countries = allowed_countries(sat_config)
+    if gs_allowed_countries is None:
+        gs_allowed_countries = allowed_countries(gs_config)
+
     shared: List[List[Optional[str]]] = []
     mismatched: List[List[Optional[str]]] = []
 
-    channels = set(sat_config.keys()).union(set(gs_config.keys()))
+    sat_country = normalize_license_country(satellite["license_country"])
+    gs_country = ground_station["license_country"]
+
+    channels = sat_config.keys() | gs_config.keys()
     for chan in channels:
         sat_chan = sat_config.get(chan)
         gs_chan = gs_config.get(chan)
 
-        reason = channel_rejection_reason(satellite, ground_station, sat_chan, gs_chan)
+        reason = channel_rejection_reason(
+            satellite,
+            ground_station,
+            sat_chan,
+            gs_chan,
+            sat_country,
+            gs_country,
+            sat_allowed_countries.get(chan, frozenset()),
+            gs_allowed_countries.get(chan, frozenset()),
+        )
 
         if reason:
             mismatched.append([chan, reason])
@@ -103,8 +193,9 @@ def compare_channels(
             annotations = [i.apply(sat_chan, gs_chan) for i in inspections]
             shared.append([chan, *annotations])
 
-    shared = sorted(shared)
-    mismatched = sorted(mismatched)
+    # Channel names are unique, so there's no need to compare the rest of the row.
+    shared.sort(key=itemgetter(0))
+    mismatched.sort(key=itemgetter(0))
     return (shared, mismatched)
 
 
@@ -124,7 +215,8 @@ def merge_static_parameters(sat_params: Any, gs_params: Any) -> Any:
                 for (sp, gp) in zip_longest(sat_params, gs_params, fillvalue=None)
             ]
         case (dict(_), dict(_)):
-            keys = chain(sat_params.keys(), gs_params.keys())
+            # De-duplicate the keys, or shared subtrees get merged twice at every level.
+            keys = dict.fromkeys(chain(sat_params.keys(), gs_params.keys()))
             return {
                 k: merge_static_parameters(sat_params.get(k), gs_params.get(k))
                 for k in keys
@@ -149,8 +241,12 @@ class MergedParametersInspection:
 
         merged_params = merge_static_parameters(sat_params, gs_params)
 
-        merge_str: str = dump_yaml_string(merged_params)
-        return merge_str
+        # The same parameters come up for many pairs, and dumping YAML is slow. Pickles make exact
+        # keys, telling apart values which compare equal but are written differently (1 and 1.0).
+        key = pickle.dumps(merged_params)
+        if key not in MERGED_PARAMS_YAML:
+            MERGED_PARAMS_YAML[key] = dump_yaml_string(merged_params)
+        return MERGED_PARAMS_YAML[key]
 
 
 class ContactTypeInspection:
@@ -219,7 +315,13 @@ class AuditReport:
         ground_station = load_tk_asset(env, GROUND_STATION, gs_id)
 
         self.shared, self.mismatched = compare_channels(
-            sat_config, gs_config, satellite, ground_station, inspections
+            sat_config,
+            gs_config,
+            satellite,
+            ground_station,
+            inspections,
+            load_allowed_countries(env, sat_id),
+            load_allowed_countries(env, gs_id),
         )
 
     def __str__(self) -> str:
@@ -234,7 +336,32 @@ class AuditReport:
         else:
             out += colored("(No channels passed licensing rules)", "magenta")
 
-        rejected_table = tabulate(self.mismatched, ["Channel", "Reason"])
+        rejected_table = simple_table(self.mismatched, ["Channel", "Reason"])
         out += f"\n\nRejected Channels\n\n{rejected_table}\n"
 
         return out
+
+
+def preload_assets(env: Environment, sat_ids: List[str], gs_ids: List[str]) -> None:
+    """Load everything audited about the given assets into this process's caches.
+
+    Done before auditing pairs in worker processes, so that forked workers start out with the
+    configs and TK records cached instead of each loading or fetching them again.
+    """
+    for kind, ids in ((SATELLITE, sat_ids), (GROUND_STATION, gs_ids)):
+        for asset in ids:
+            load_allowed_countries(env, asset)
+            load_tk_asset(env, kind, asset)
+
+
+def audit_report(
+    env: Environment, sat_id: str, gs_id: str, matches_only: bool = False
+) -> Optional[str]:
+    """Audit a satellite and ground station pair, returning the printable report.
+
+    Returns None if `matches_only` is set and the pair shares no channels.
+    """
+    report = AuditReport(env, sat_id, gs_id)
+    if report.shared or not matches_only:
+        return str(report)
+    return None
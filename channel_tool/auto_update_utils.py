@@ -1,7 +1,7 @@
 import csv
 import sys
 import warnings
-from typing import Any, Callable, List, Mapping
+from typing import Any, Callable, List, Mapping, Optional
 
 warnings.formatwarning = lambda msg, *args, **kwargs: f"Warning: {msg}\n"
 
@@ -17,12 +17,13 @@ def exponential_moving_average(
     smoothing: int = 2,
 ) -> float:
     # Below is the standard EMA formula implemented manually
-    # to avoid importing modules unnecessarily
+    # to avoid importing modules unnecessarily. It's written in the incremental form, which needs
+    # one multiplication per step and doesn't lose precision to the (1 - factor) term.
     factor = smoothing / (1 + history_length_days)
     ema = simple_moving_average(history, history_length_days, result_safety_factor)
 
-    for i in range(1, len(history)):
-        ema = history[i] * factor + ema * (1 - factor)
+    for x in history[1:]:
+        ema += factor * (x - ema)
 
     return round(float(ema * result_safety_factor), 2)
 
@@ -42,27 +43,48 @@ def simple_moving_average(
 def read_history(
     column: str, source_file: str, conversion_factor: float
 ) -> Mapping[str, list[float]]:
-    goodput = {}  # type: ignore
+    """Read the history of each channel from a CSV file, in sync_id order.
+
+    Rows are bucketed by channel in a single pass and each channel is sorted on its own. Channels
+    come out in the order of their earliest row, as if the whole file had been sorted first.
+    """
+    rows: dict[str, list[tuple[str, int, Optional[float]]]] = {}
     # If csvfile is a file object, it should be opened with newline=''
     # https://docs.python.org/3/library/csv.html
     with open(source_file, newline="", encoding="utf-8-sig") as f:
-        contents = csv.DictReader(f)
-        sorted_contents = sorted(contents, key=lambda row: row["sync_id"])
-        for row in sorted_contents:
+        reader = csv.reader(f)
+        # Look the columns up once, rather than building a dict for every row.
+        header = next(reader, [])
+        for name in ("channel_id", "sync_id", column):
+            if name not in header:
+                sys.exit(f"No column named '{name}' was found in {source_file}.")
+        channel_idx = header.index("channel_id")
+        sync_idx = header.index("sync_id")
+        value_idx = header.index(column)
+
+        for i, row in enumerate(reader):
+            if not row:
+                continue
             try:
-                goodput.setdefault(row["channel_id"], []).append(
-                    float(row[column]) * conversion_factor
+                history = rows.setdefault(row[channel_idx], [])
+                history.append(
+                    (row[sync_idx], i, float(row[value_idx]) * conversion_factor)
                 )
             except IndexError:
                 warnings.warn(f"Empty line on {source_file} skipped")
             except ValueError:
+                # Keep the row's place, so the channel is listed in the same position regardless.
+                history.append((row[sync_idx], i, None))
                 warnings.warn(
-                    f"Non-float value {row[column]} on {source_file} sync_id:{row['sync_id']} skipped"
+                    f"Non-float value {row[value_idx]} on {source_file} sync_id:{row[sync_idx]} skipped"
                 )
-            except KeyError as e:
-                sys.exit(f"No column named {e} was found in {source_file}.")
 
-    return goodput
+    for history in rows.values():
+        history.sort()
+    return {
+        channel: [value for (_, _, value) in history if value is not None]
+        for channel, history in sorted(rows.items(), key=lambda item: item[1][0][:2])
+    }
 
 
 def create_config_updates(
@@ -86,15 +108,9 @@ def create_config_updates(
         return str(int(new_value)) + "s"
 
 
-def asset_to_predicates(asset: str, compiler: Callable[[str], Any]) -> Any:
-    """
-    Takes a ground station ID and returns predicate functions that filters it's
-    UHF link profiles out. As active ground stations change, These lists should
-    be updated manually. Note that this function returns a list, more than one
-    predicate may be compiled if necessary.
-    """
-    asset = asset.upper()
-    min_elevation_25 = [
+# Ground stations whose UHF link profiles are filtered by minimum elevation in auto-updates.
+MIN_ELEVATION_25_GSS = frozenset(
+    [
         "ANCGS",
         "BDLGS",
         "BDUGS",
@@ -126,11 +142,21 @@ def asset_to_predicates(asset: str, compiler: Callable[[str], Any]) -> Any:
         "TUSGS",
         "WBUGS",
     ]
-    min_elevation_10 = ["AWAGS", "TOSGS", "ICEGS", "PERGS"]
+)
+MIN_ELEVATION_10_GSS = frozenset(["AWAGS", "TOSGS", "ICEGS", "PERGS"])
 
-    if asset in min_elevation_25:
+
+def asset_to_predicates(asset: str, compiler: Callable[[str], Any]) -> Any:
+    """
+    Takes a ground station ID and returns predicate functions that filters it's
+    UHF link profiles out. As active ground stations change, These lists should
+    be updated manually. Note that this function returns a list, more than one
+    predicate may be compiled if necessary.
+    """
+    asset = asset.upper()
+    if asset in MIN_ELEVATION_25_GSS:
         return [compiler("min_elevation_deg >= 25")]
-    elif asset in min_elevation_10:
+    elif asset in MIN_ELEVATION_10_GSS:
         return [compiler("min_elevation_deg >= 10")]
 
     warnings.warn(
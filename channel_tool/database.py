@@ -1,31 +1,27 @@
 """Prototype schema for representing the Channel Config data in a relational database."""
 
+import itertools
 import json
 import os
 import sqlite3
-from collections import defaultdict
-from typing import Any, DefaultDict, List, Mapping, Optional
+from operator import itemgetter
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 from uuid import UUID, uuid4
 
-from ruamel.yaml import YAML
-
 from channel_tool.asset_config import infer_asset_type, load_asset_config, locate_assets
 from channel_tool.typedefs import AssetConfig, ChannelDefinition, Environment
-from channel_tool.util import GROUND_STATION, SATELLITE
+from channel_tool.util import GROUND_STATION, SATELLITE, load_yaml_file_fast
 
-yaml = YAML()
-with open("contact_type_defs.yaml") as f:
-    y = yaml.load(f)
-    CHANNEL_DEFS = y["contact_types"]
-    BAND_DEFS = y["bands"]
+y = load_yaml_file_fast("contact_type_defs.yaml")
+CHANNEL_DEFS = y["contact_types"]
+BAND_DEFS = y["bands"]
 
-with open("sat_license_defs.yaml") as f:
-    y = yaml.load(f)
-    SAT_LICENSE_DEFS = y["sat_licenses"]
-    GS_LICENSE_DEFS = y["gs_licenses"]
-    ALL_ISO_COUNTRIES = y["definitions"]["all_iso_countries"]
-    SPIRE_COUNTRIES = y["definitions"]["spire_gs_countries"]
-    SPIRE_ID_OVERRIDES = y["definitions"]["spire_id_overrides"]
+y = load_yaml_file_fast("sat_license_defs.yaml")
+SAT_LICENSE_DEFS = y["sat_licenses"]
+GS_LICENSE_DEFS = y["gs_licenses"]
+ALL_ISO_COUNTRIES = y["definitions"]["all_iso_countries"]
+SPIRE_COUNTRIES = y["definitions"]["spire_gs_countries"]
+SPIRE_ID_OVERRIDES = y["definitions"]["spire_id_overrides"]
 
 
 ICEGS_LICENSE_ID = uuid4()
@@ -137,46 +133,44 @@ UNLICENSED_BANDS = [
 
 ALL_BANDS = ICEGS_BANDS + LUX_MINAS_BANDS + UNLICENSED_BANDS
 
+# A SQL statement along with the values bound to its placeholders.
+Statement = Tuple[str, Tuple[Any, ...]]
 
-def license(license_def: Mapping[str, Any]) -> str:
-    desc = license_def.get("description")
-    if desc:
-        desc = f"'{desc}'"
-    else:
-        desc = "NULL"
-
-    return f"""INSERT OR IGNORE INTO License VALUES (
-        '{license_def["id"]}',
-        {desc}
-    );"""
-
-
-def frequency_band(band_def: Mapping[str, Any]) -> str:
-    return f"""
-    INSERT OR IGNORE INTO FrequencyBand VALUES (
-    '{band_def["id"]}',
-    {band_def["band"][0]},
-    {band_def["band"][1]},
-    {band_def["space_to_earth"]},
-    {band_def["earth_to_space"]}
-    );
-    """
+
+def license(license_def: Mapping[str, Any]) -> Statement:
+    return (
+        "INSERT OR IGNORE INTO License VALUES (?, ?);",
+        (str(license_def["id"]), license_def.get("description") or None),
+    )
+
+
+def frequency_band(band_def: Mapping[str, Any]) -> Statement:
+    return (
+        "INSERT OR IGNORE INTO FrequencyBand VALUES (?, ?, ?, ?, ?);",
+        (
+            str(band_def["id"]),
+            band_def["band"][0],
+            band_def["band"][1],
+            band_def["space_to_earth"],
+            band_def["earth_to_space"],
+        ),
+    )
 
 
 def licensed_frequency(
     license_id: UUID, band_id: Any, allowed_countries: Any = {}
-) -> str:
-    return f"""
-    INSERT INTO LicensedFrequency VALUES (
-    '{license_id}',
-    '{band_id}',
-    '{json.dumps(allowed_countries)}'
-    );
-    """
+) -> Statement:
+    return (
+        "INSERT INTO LicensedFrequency VALUES (?, ?, ?);",
+        (str(license_id), str(band_id), json.dumps(allowed_countries)),
+    )
 
 
-def asset(asset_id: str, asset_type: str, license_id: str) -> str:
-    return f"INSERT INTO Asset VALUES ('{asset_id}', '{asset_type}', '{license_id}');"
+def asset(asset_id: Any, asset_type: str, license_id: Any) -> Statement:
+    return (
+        "INSERT INTO Asset VALUES (?, ?, ?);",
+        (str(asset_id), asset_type, str(license_id)),
+    )
 
 
 CHANNELS = [
@@ -225,27 +219,26 @@ CHANNELS = [
 ]
 
 
-def channel(channel_def: Mapping[str, Any]) -> str:
-    return f"""
-    INSERT INTO Channel VALUES (
-    '{channel_def["id"]}',
-    '{channel_def["desc"]}',
-    '{channel_def["contact_type"]}',
-    '{channel_def["directionality"]}'
+def channel(channel_def: Mapping[str, Any]) -> Statement:
+    return (
+        "INSERT INTO Channel VALUES (?, ?, ?, ?);",
+        (
+            str(channel_def["id"]),
+            str(channel_def["desc"]),
+            str(channel_def["contact_type"]),
+            str(channel_def["directionality"]),
+        ),
     )
-    """
 
 
-def channel_frequency(channel_id: str, band_id: str) -> str:
-    return f"""
-        INSERT INTO ChannelFrequency VALUES (
-        '{channel_id}',
-        '{band_id}'
-        )
-        """
+def channel_frequency(channel_id: str, band_id: str) -> Statement:
+    return (
+        "INSERT INTO ChannelFrequency VALUES (?, ?);",
+        (str(channel_id), str(band_id)),
+    )
 
 
-def channel_frequencies(channel_def: Mapping[str, Any]) -> List[str]:
+def channel_frequencies(channel_def: Mapping[str, Any]) -> List[Statement]:
     return [
         channel_frequency(channel_def["id"], freq)
         for freq in channel_def["frequencies"]
@@ -264,59 +257,47 @@ def asset_channel_config(
     link_profile: Optional[str] = None,
     parameter_set: Optional[str] = None,
     enabled: bool = True,
-) -> str:
-    lp = f"'{link_profile}'" if link_profile else "NULL"
-    ps = f"'{parameter_set}'" if parameter_set else "NULL"
-
-    return f"""
-    INSERT OR REPLACE INTO AssetChannelConfig VALUES (
-    '{asset_id}',
-    '{channel_id}',
-    {enabled},
-    {lp},
-    {ps}
+) -> Statement:
+    return (
+        "INSERT OR REPLACE INTO AssetChannelConfig VALUES (?, ?, ?, ?, ?);",
+        (
+            str(asset_id),
+            str(channel_id),
+            enabled,
+            str(link_profile) if link_profile else None,
+            str(parameter_set) if parameter_set else None,
+        ),
     )
-    """
 
 
-def link_profile(id: str, profile: Any, contact_overhead_time: Any) -> str:
-    return f"""
-    INSERT OR REPLACE INTO LinkProfile VALUES (
-    '{id}',
-    '{json.dumps(profile)}',
-    '{contact_overhead_time}'
+def link_profile(id: str, profile: Any, contact_overhead_time: Any) -> Statement:
+    return (
+        "INSERT OR REPLACE INTO LinkProfile VALUES (?, ?, ?);",
+        (str(id), json.dumps(profile), str(contact_overhead_time)),
     )
-    """
 
 
-def parameter_set(id: str, params: Any) -> str:
-    return f"""
-    INSERT OR REPLACE INTO ParameterSet VALUES (
-    '{id}',
-    '{json.dumps(params)}'
+def parameter_set(id: str, params: Any) -> Statement:
+    return (
+        "INSERT OR REPLACE INTO ParameterSet VALUES (?, ?);",
+        (str(id), json.dumps(params)),
     )
-    """
 
 
-def constraint_definition(id: str, kind: str, definition: Any) -> str:
-    return f"""
-    INSERT OR REPLACE INTO ConstraintDefinition VALUES (
-    '{id}',
-    '{kind}',
-    '(No description)',
-    '{json.dumps(definition)}'
+def constraint_definition(id: str, kind: str, definition: Any) -> Statement:
+    return (
+        "INSERT OR REPLACE INTO ConstraintDefinition VALUES (?, ?, ?, ?);",
+        (str(id), kind, "(No description)", json.dumps(definition)),
     )
-    """
 
 
-def operational_constraint(asset_id: str, channel_id: str, constraint_id: str) -> str:
-    return f"""
-    INSERT OR REPLACE INTO OperationalConstraint VALUES (
-    '{asset_id}',
-    '{channel_id}',
-    '{constraint_id}'
+def operational_constraint(
+    asset_id: str, channel_id: str, constraint_id: str
+) -> Statement:
+    return (
+        "INSERT OR REPLACE INTO OperationalConstraint VALUES (?, ?, ?);",
+        (str(asset_id), str(channel_id), str(constraint_id)),
     )
-    """
 
 
 SCHEMA = [
@@ -414,12 +395,18 @@ SCHEMA = [
     """,
 ]
 
-SAMPLE_DATA_SCHEMA = [
-    f"INSERT INTO License VALUES ('{ICEGS_LICENSE_ID}', 'Norwegian ground station license');",
-    f"INSERT INTO License VALUES ('{LUX_MINAS_USMA_LICENSE_ID}', 'Luxembourg MINAS with US Market Access');",
+SAMPLE_DATA_SCHEMA: List[Statement] = [
+    (
+        "INSERT INTO License VALUES (?, ?);",
+        (str(ICEGS_LICENSE_ID), "Norwegian ground station license"),
+    ),
+    (
+        "INSERT INTO License VALUES (?, ?);",
+        (str(LUX_MINAS_USMA_LICENSE_ID), "Luxembourg MINAS with US Market Access"),
+    ),
     *[frequency_band(b) for b in ALL_BANDS],
-    f"INSERT INTO Asset VALUES ('icegs', 'ground_station', '{ICEGS_LICENSE_ID}');",
-    f"INSERT INTO Asset VALUES ('FM100', 'satellite', '{LUX_MINAS_USMA_LICENSE_ID}');",
+    asset("icegs", "ground_station", ICEGS_LICENSE_ID),
+    asset("FM100", "satellite", LUX_MINAS_USMA_LICENSE_ID),
     *[licensed_frequency(LUX_MINAS_USMA_LICENSE_ID, b["id"]) for b in LUX_MINAS_BANDS],
     *[licensed_frequency(ICEGS_LICENSE_ID, b["id"]) for b in ICEGS_BANDS],
     *[channel(c) for c in CHANNELS],
@@ -431,16 +418,24 @@ SAMPLE_DATA_SCHEMA = [
 ]
 
 
-def _run_statements(stmts: List[str]) -> None:
+def _run_statements(stmts: List[Statement]) -> None:
     con = sqlite3.connect("channels.db")
     cur = con.cursor()
-    for line in stmts:
+    # Run consecutive statements sharing the same SQL together, so SQLite only compiles it once.
+    # Everything still runs in the order it was given.
+    for sql, group in itertools.groupby(stmts, key=itemgetter(0)):
+        param_rows = [params for (_, params) in group]
         try:
-            cur.execute(line)
-            con.commit()
+            # Only DML can be run through executemany, so schema changes go one by one.
+            if len(param_rows) == 1:
+                cur.execute(sql, param_rows[0])
+            else:
+                cur.executemany(sql, param_rows)
         except Exception as e:
-            print("Failed to execute SQL statement:\n", line)
+            print("Failed to execute SQL statement:\n", sql)
             raise e
+    # Commit once at the end, so that the whole batch is written out in a single transaction.
+    con.commit()
 
 
 def init() -> None:
@@ -449,7 +444,7 @@ def init() -> None:
         os.remove("channels.db")
     except FileNotFoundError:
         pass
-    _run_statements(SCHEMA)
+    _run_statements([(stmt, ()) for stmt in SCHEMA])
 
 
 def load_sample_data() -> None:
@@ -498,24 +493,25 @@ def allows_use(licensed_freqs: List[Any], band_def: Mapping[str, Any]) -> bool:
 def _create_licenses() -> None:
     defs = []
 
-    for id, license_info in SAT_LICENSE_DEFS.items():
-        defs.append(license({"id": id, **license_info}))
+    for lid, license_info in SAT_LICENSE_DEFS.items():
+        defs.append(license({"id": lid, **license_info}))
 
+    # Kept apart from the licenses so that each kind of statement runs as a single batch.
     for lid, license_info in SAT_LICENSE_DEFS.items():
+        # The same for every band of the license, so only work it out once it's needed.
+        sat_countries: Optional[List[str]] = None
         for bid, band_info in BAND_DEFS.items():
             if allows_use(license_info["frequencies"], band_info):
-                allowed_countries = [
-                    c
-                    for c in SPIRE_COUNTRIES
-                    if c not in license_info["blacklisted_countries"]
-                ]
-                defs.append(licensed_frequency(lid, bid, allowed_countries))
-
-    stations: DefaultDict[str, Any] = defaultdict(lambda: defaultdict(list))
+                if sat_countries is None:
+                    blacklist = set(license_info["blacklisted_countries"])
+                    sat_countries = [c for c in SPIRE_COUNTRIES if c not in blacklist]
+                defs.append(licensed_frequency(lid, bid, sat_countries))
+
+    stations: Dict[str, Dict[str, List[str]]] = {}
     for band, countries in GS_LICENSE_DEFS.items():
         for country, allowed_stations in countries.items():
             for station in allowed_stations:
-                stations[station][band].append(country)
+                stations.setdefault(station, {}).setdefault(band, []).append(country)
 
     for station, bands in stations.items():
         lid = f"{station}_gs_license"
@@ -581,7 +577,7 @@ def load_license_data() -> None:
 
 def _shared_asset_channel_defs(
     asset_id: str, cid: str, channel_def: ChannelDefinition
-) -> List[str]:
+) -> List[Statement]:
     defs = []
     lp_id = f"{asset_id}_{cid}_profile"
     ps_id = f"{asset_id}_{cid}_params"
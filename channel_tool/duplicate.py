@@ -1,4 +1,3 @@
-from copy import deepcopy
 from enum import Enum
 from types import SimpleNamespace
 from typing import Any
@@ -6,6 +5,7 @@ from typing import Any
 from channel_tool.naming import class_annos_to_name
 from channel_tool.pls_tool import pls_lookup
 from channel_tool.typedefs import ChannelDefinition
+from channel_tool.util import copy_yaml
 
 
 class DuplicateError(Exception):
@@ -55,7 +55,7 @@ def merge_forward_channels(d1: dict[Any, Any], d2: dict[Any, Any]) -> dict[Any,
     if the behavior matches
     """
     assert isinstance(d1, dict) and isinstance(d2, dict)
-    d = deepcopy(d1)
+    d: dict[str, Any] = copy_yaml(d1)
     for key in d2:
         if key not in d1:
             d[key] = d2[key]
@@ -91,10 +91,10 @@ def update_nested_value(
     if not keys or not d:
         raise DuplicateError("`d` and `keys` must be populated!")
 
-    # deepcopy the input to make sure we don't carry over any references this
+    # copy the input to make sure we don't carry over any references this
     # needs to be done once so it is wasteful for recursive calls but it'd be a
     # risk to have the caller handle it
-    new_value = deepcopy(new_value)
+    new_value = copy_yaml(new_value)
     key = keys[0]
 
     if len(keys) == 1:
@@ -1,13 +1,44 @@
-from typing import Dict, Optional, Tuple, Union
+from typing import Any, Dict, Optional, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from channel_tool.typedefs import AssetKind, Environment, TkGroundStation, TkSatellite
 from channel_tool.util import tk_url
 
-TK_ASSET_CACHE: Dict[
-    Tuple[str, str, Optional[str]], Union[TkGroundStation, TkSatellite]
-] = {}
+TK_ASSET_CACHE: Dict[Tuple[str, str, Optional[str]], Any] = {}
+
+# Connect and read timeouts, in seconds.
+TK_TIMEOUT = (3.05, 30)
+
+# Share one session between requests so that connections to TK are pooled and kept alive.
+TK_SESSION = requests.Session()
+TK_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.2),
+    ),
+)
+
+
+def fetch_tk(url: str) -> Any:
+    r = TK_SESSION.get(url, timeout=TK_TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+
+def load_tk_assets(env: Environment, kind: AssetKind) -> Any:
+    """Load every asset of a kind from TK at once, populating the cache for each of them."""
+    if (env, kind, None) not in TK_ASSET_CACHE:
+        assets = fetch_tk(tk_url(env) + kind)
+        TK_ASSET_CACHE[(env, kind, None)] = assets
+        for asset in assets:
+            if isinstance(asset, dict) and "name" in asset:
+                TK_ASSET_CACHE[(env, kind, asset["name"])] = asset
+    return TK_ASSET_CACHE[(env, kind, None)]
 
 
 # TODO enum type for assets
@@ -15,15 +46,8 @@ def load_tk_asset(
     env: Environment, kind: AssetKind, name: Optional[str] = None
 ) -> Union[TkGroundStation, TkSatellite]:
     if (env, kind, name) not in TK_ASSET_CACHE:
-        # TODO Load all of the assets to populate cache rather than fetching them one by one
-        if name:
-            suffix = f"/{name}"
-        else:
-            suffix = ""
-        r = requests.get(tk_url(env) + kind + suffix)
-        r.raise_for_status()
-        val = r.json()
-        TK_ASSET_CACHE[(env, kind, name)] = val
-        return val  # type: ignore
-    else:
-        return TK_ASSET_CACHE[(env, kind, name)]
+        load_tk_assets(env, kind)
+    if (env, kind, name) not in TK_ASSET_CACHE:
+        # Not part of the collection listing, so ask for it by name.
+        TK_ASSET_CACHE[(env, kind, name)] = fetch_tk(tk_url(env) + f"{kind}/{name}")
+    return TK_ASSET_CACHE[(env, kind, name)]  # type: ignore
@@ -1,10 +1,29 @@
 import difflib
+import hashlib
 import os
+import pickle
+import shutil
 import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from copy import deepcopy
 from io import StringIO
-from typing import Any, Dict, List, Mapping, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
+import ruamel.yaml
 from ruamel.yaml import YAML
 from termcolor import colored
 
@@ -38,7 +57,21 @@ SCHEMA_FILE = "schema.yaml"
 SAT_TEMPLATE_FILE = "sat_templates.yaml"
 GS_TEMPLATE_FILE = "gs_templates.yaml"
 
+# Lines of context shown around changes when confirming edits.
+DIFF_CONTEXT = 3
+
 _yaml = YAML()
+# Never emit anchors and aliases for structures which happen to be shared in memory. They make
+# config files and diffs hard to read.
+_yaml.representer.ignore_aliases = lambda *args: True
+# The safe loader is backed by the C extension (ruamel.yaml.clib) when it is available and does not
+# track comments or formatting, which makes it several times faster than the round-trip loader. Only
+# use it for data which will never be written back to disk.
+_safe_yaml = YAML(typ="safe")
+
+TEMPLATE_CACHE: Dict[str, Dict[str, ChannelDefinition]] = {}
+# Templates loaded with the safe loader, for callers which only read them.
+FAST_TEMPLATE_CACHE: Dict[str, Dict[str, ChannelDefinition]] = {}
 
 
 def info(s: str) -> None:
@@ -80,9 +113,30 @@ def lookup(path: str, d: Mapping[str, Any]) -> Any:
     return field
 
 
+SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+def copy_yaml(obj: Any) -> Any:
+    """Deep-copy YAML data.
+
+    Plain dicts, lists and scalars are copied by dispatching on their exact type, which is much
+    cheaper than `deepcopy`. Anything else, such as ruamel's commented containers, goes through
+    `deepcopy` so that comments and formatting are kept.
+    """
+    t = type(obj)
+    if t in SCALAR_TYPES:
+        return obj
+    elif t is dict:
+        return {k: copy_yaml(v) for k, v in obj.items()}
+    elif t is list:
+        return [copy_yaml(v) for v in obj]
+    else:
+        return deepcopy(obj)
+
+
 def set_path(path: str, d: Mapping[str, Any], val: Any) -> Mapping[str, Any]:
     """Set a nested path in a dict given as dot-separated fields, creating it if needed."""
-    d2 = deepcopy(d)
+    d2: Mapping[str, Any] = copy_yaml(d)
     path_elts = path.split(".")
     parent: Any = d2
     for elt in path_elts[:-1]:
@@ -104,21 +158,132 @@ def get_git_revision() -> str:
     return subprocess.getoutput("git rev-parse --short HEAD")
 
 
-def load_yaml_file(f_name: str) -> Any:
+def yaml_file_names(directory: str) -> List[str]:
+    """List the names, without extension, of the YAML files in a directory, in sorted order."""
+    with os.scandir(directory) as entries:
+        return sorted(
+            e.name[: -len(".yaml")]
+            for e in entries
+            if e.name.endswith(".yaml") and e.is_file()
+        )
+
+
+def parallel_map(fn: Callable[..., Any], *iterables: Iterable[Any]) -> Iterator[Any]:
+    """Like `map`, but spreads the calls over a pool of worker processes when there are CPUs to spare.
+
+    Results come back in order. The function, arguments and results must all be picklable.
+    """
+    if (os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor() as executor:
+            yield from executor.map(fn, *iterables)
+    else:
+        yield from map(fn, *iterables)
+
+
+def captured_call(
+    fn: Callable[..., Any], *args: Any
+) -> Tuple[Any, str, Optional[Exception]]:
+    """Call a function, capturing what it prints. Returns its result along with the output.
+
+    Lets work spread over `parallel_map` print its output in order once it is done. If the call
+    fails, the exception is returned in place of the result rather than raised, so that the caller
+    can print the output leading up to it in order before raising it.
+    """
+    output = StringIO()
+    # Keep the colors when the output ends up on a terminal.
+    output.isatty = sys.stdout.isatty  # type: ignore
+    try:
+        with redirect_stdout(output):
+            result = fn(*args)
+    except Exception as e:
+        return None, output.getvalue(), e
+    return result, output.getvalue(), None
+
+
+def yaml_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "channel_tool", "yaml")
+
+
+def load_yaml_file_cached(f_name: str, yaml: YAML) -> Any:
+    """Load a YAML file, reusing the parse from an earlier run if the file hasn't changed since.
+
+    Parse results are pickled to a per-user cache directory, one entry per file and loader, and are
+    only used while the file's contents still hash the same. Reading and hashing the file is cheap,
+    and unlike its modification time it can't miss a change. Unpickling is much faster than
+    parsing, especially with the round-trip loader. Problems with the cache are ignored.
+    """
     with open(f_name) as f:
-        return load_yaml_value(f)
+        text = f.read()
+    stamp = (hashlib.sha1(text.encode()).hexdigest(), ruamel.yaml.__version__)
+    key = f"{os.path.abspath(f_name)}:{','.join(yaml.typ)}"
+    cache_file = os.path.join(
+        yaml_cache_dir(), hashlib.sha1(key.encode()).hexdigest() + ".pickle"
+    )
+    try:
+        with open(cache_file, "rb") as f:
+            cached_stamp, data = pickle.load(f)
+        if cached_stamp == stamp:
+            return data
+    except Exception:
+        pass
+
+    # Parse from a stream named after the file, so that errors point at it.
+    stream = StringIO(text)
+    stream.name = f_name
+    data = yaml.load(stream)
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((stamp, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, cache_file)
+    except Exception:
+        pass
+    return data
+
+
+def load_yaml_file(f_name: str) -> Any:
+    return load_yaml_file_cached(f_name, _yaml)
 
 
 def load_yaml_value(v: Any) -> Any:
     return _yaml.load(v)
 
 
+def load_yaml_file_fast(f_name: str) -> Any:
+    """Load a YAML file as plain Python data, discarding comments and formatting."""
+    return load_yaml_file_cached(f_name, _safe_yaml)
+
+
 def dump_yaml_string(obj: Optional[Mapping[str, Any]]) -> str:
     with StringIO() as stream:
         _yaml.dump(obj, stream)
         return stream.getvalue()
 
 
+def dump_yaml_lines(obj: Optional[Mapping[str, Any]]) -> List[str]:
+    """Dump an object to YAML as a list of lines, each keeping its line ending."""
+    with StringIO() as stream:
+        _yaml.dump(obj, stream)
+        stream.seek(0)
+        return stream.readlines()
+
+
+def replace_file(f_name: str, contents: str) -> None:
+    """Write a file by swapping in a new one, so it is never left partially written."""
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(f_name) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(contents)
+        if os.path.exists(f_name):
+            shutil.copymode(f_name, tmp_name)
+        os.replace(tmp_name, f_name)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
 def dump_yaml_file(data: Any, f_name: str) -> None:
     with open(f_name, mode="w+") as f:
         _yaml.dump(data, f)
@@ -168,12 +333,23 @@ def str_to_list(values: str) -> List[str]:
     return values.split(",")
 
 
+BOOL_STRINGS = {
+    "y": True,
+    "yes": True,
+    "true": True,
+    "1": True,
+    "n": False,
+    "no": False,
+    "false": False,
+    "0": False,
+}
+
+
 def str_to_bool(val: str) -> bool:
-    if val.lower() in ["y", "yes", "true", "1"]:
-        return True
-    if val.lower() in ["n", "no", "false", "0"]:
-        return False
-    raise ValueError(f"Unrecognized input '{val}'")
+    try:
+        return BOOL_STRINGS[val.lower()]
+    except KeyError:
+        raise ValueError(f"Unrecognized input '{val}'") from None
 
 
 def color_diff_line(line: str) -> str:
@@ -188,12 +364,31 @@ def color_diff_line(line: str) -> str:
 
 
 def format_diff(
-    existing: Optional[ChannelDefinition], new: Optional[ChannelDefinition]
+    existing: Optional[ChannelDefinition],
+    new: Optional[ChannelDefinition],
+    context: Optional[int] = DIFF_CONTEXT,
 ) -> str:
-    a = dump_yaml_string(existing).splitlines(keepends=True)
-    b = dump_yaml_string(new).splitlines(keepends=True)
-    lines = max(len(a), len(b))  # Show all context
-    d = difflib.unified_diff(a, b, n=lines)
+    """Format a colored unified diff between two channel definitions.
+
+    Shows `context` lines around each change, or the whole definition if it is None. Unless the
+    whole definition is wanted, only the fields that changed are dumped and compared.
+    """
+    if context is not None and isinstance(existing, dict) and isinstance(new, dict):
+        changed = [
+            k
+            for k in {**existing, **new}
+            if k not in existing or k not in new or existing[k] != new[k]
+        ]
+        existing = {k: existing[k] for k in changed if k in existing}
+        new = {k: new[k] for k in changed if k in new}
+        a = dump_yaml_lines(existing) if existing else []
+        b = dump_yaml_lines(new) if new else []
+    else:
+        a = dump_yaml_lines(existing)
+        b = dump_yaml_lines(new)
+    if context is None:
+        context = max(len(a), len(b))  # Show all context
+    d = difflib.unified_diff(a, b, n=context)
     cd = [color_diff_line(line) for line in d]
     return "".join(cd)
 
@@ -206,12 +401,36 @@ def find_template(asset_type: str, channel: str) -> ChannelDefinition:
     else:
         raise Exception(f"Unknown asset type {asset_type}")
     if os.path.exists(template_file):
-        templates: Dict[str, ChannelDefinition] = load_yaml_file(template_file)
+        templates = load_templates(template_file)
         if channel in templates:
-            return templates[channel]
+            # Copy so that callers can't modify the cached template.
+            template: ChannelDefinition = copy_yaml(templates[channel])
+            return template
         else:
             raise MissingTemplateError(
                 f"Could not find template for {channel} in {template_file}"
             )
     else:
         raise FileNotFoundError(f"Could not find file {template_file}")
+
+
+def load_templates(template_file: str) -> Dict[str, ChannelDefinition]:
+    if template_file not in TEMPLATE_CACHE:
+        TEMPLATE_CACHE[template_file] = load_yaml_file(template_file)
+    return TEMPLATE_CACHE[template_file]
+
+
+def write_templates(
+    templates: Dict[str, ChannelDefinition], template_file: str
+) -> None:
+    """Write templates back to their file, keeping the template caches in step with it."""
+    dump_yaml_file(templates, template_file)
+    TEMPLATE_CACHE[template_file] = templates
+    FAST_TEMPLATE_CACHE.pop(template_file, None)
+
+
+def load_templates_fast(template_file: str) -> Dict[str, ChannelDefinition]:
+    """Load templates as plain data. The result is shared, so it must not be modified."""
+    if template_file not in FAST_TEMPLATE_CACHE:
+        FAST_TEMPLATE_CACHE[template_file] = load_yaml_file_fast(template_file)
+    return FAST_TEMPLATE_CACHE[template_file]
@@ -1,4 +1,6 @@
+import itertools
 import os
+from types import SimpleNamespace
 from typing import Any, Callable, Dict, List, Optional, Set, cast
 
 import jsonschema
@@ -23,7 +25,9 @@ from channel_tool.util import (
     SCHEMA_FILE,
     SHARED_CONSTRAINT_SET,
     SHARED_SEP_CONSTRAINTS_DIR,
-    load_yaml_file,
+    load_yaml_file_fast,
+    parallel_map,
+    yaml_file_names,
 )
 from channel_tool.validation_rules import (
     ValidationRule,
@@ -57,6 +61,16 @@ class SchemaValidationError(Exception):
         {self._parent.context}
         """
 
+    def __reduce__(self) -> Any:
+        # jsonschema errors can't be pickled, so pass a snapshot of the parts shown to the user
+        # when sending this error between processes.
+        parent = SimpleNamespace(
+            message=self._parent.message,
+            json_path=self._parent.json_path,
+            context=str(self._parent.context),
+        )
+        return (SchemaValidationError, (parent, self._file, self._key, self._count))
+
 
 class TemplateValidationError(Exception):
     pass
@@ -128,12 +142,8 @@ def validate_all(args: Any) -> None:
         shared_constraint_sets = {}
         shared_constraint_set_dir = os.path.join(env, SHARED_SEP_CONSTRAINTS_DIR)
         if os.path.isdir(shared_constraint_set_dir):
-            shared_constraint_set_files = os.listdir(shared_constraint_set_dir)
-            shared_sep_constraint_names = [
-                os.path.splitext(os.path.basename(p))[0]
-                for p in shared_constraint_set_files
-            ]
-            for shared_sep_constraint_set in sorted(shared_sep_constraint_names):
+            shared_sep_constraint_names = yaml_file_names(shared_constraint_set_dir)
+            for shared_sep_constraint_set in shared_sep_constraint_names:
                 print(f"{shared_sep_constraint_set}... ", end="")
                 config = check_file_conforms_to_schema(
                     SHARED_CONSTRAINT_SET,
@@ -157,22 +167,28 @@ def validate_all(args: Any) -> None:
         )
         print(f"Checking {env} satellite configs conform to the schema ...")
         all_sat_configs = {}
-        for sat_id in sorted(all_sats):
+        ids = sorted(all_sats)
+        configs = parallel_map(
+            check_file_conforms_to_schema,
+            itertools.repeat(SATELLITE),
+            [infer_config_file(env, i) for i in ids],
+        )
+        for sat_id in ids:
             print(f"{sat_id}... ", end="")
-            config = check_file_conforms_to_schema(
-                SATELLITE, infer_config_file(env, sat_id)
-            )
-            all_sat_configs[sat_id] = config
+            all_sat_configs[sat_id] = next(configs)
             print(colored("PASS", "green"))
 
         print(f"Checking {env} groundstation configs conform to the schema ...")
         all_gs_configs = {}
-        for gs_id in sorted(all_stations):
+        ids = sorted(all_stations)
+        configs = parallel_map(
+            check_file_conforms_to_schema,
+            itertools.repeat(GROUND_STATION),
+            [infer_config_file(env, i) for i in ids],
+        )
+        for gs_id in ids:
             print(f"{gs_id}... ", end="")
-            config = check_file_conforms_to_schema(
-                GROUND_STATION, infer_config_file(env, gs_id)
-            )
-            all_gs_configs[gs_id] = config
+            all_gs_configs[gs_id] = next(configs)
             print(colored("PASS", "green"))
 
         print(
@@ -221,12 +237,13 @@ def check_allowed_keys(
 
 
 def check_file_conforms_to_schema(asset_type: str, cf: str) -> Any:
-    config = load_yaml_file(cf)
+    config = load_yaml_file_fast(cf)
 
     if asset_type == GROUND_STATION or asset_type == SATELLITE:
+        validator = load_validator(asset_type)
         for key in config:
             c = config[key]
-            check_element_conforms_to_schema(asset_type, c, file=cf, key=key)
+            check_element_conforms_to_validator(validator, c, file=cf, key=key)
     elif asset_type == SHARED_CONSTRAINT_SET:
         check_element_conforms_to_schema(asset_type, config, file=cf, key=None)
     else:
@@ -237,8 +254,15 @@ def check_file_conforms_to_schema(asset_type: str, cf: str) -> Any:
 def check_element_conforms_to_schema(
     asset_type: str, config: Any, file: str, key: Optional[str]
 ) -> None:
-    schema = load_schema(asset_type)
-    errs = list(jsonschema.Draft7Validator(schema).iter_errors(config))  # type: ignore
+    check_element_conforms_to_validator(
+        load_validator(asset_type), config, file=file, key=key
+    )
+
+
+def check_element_conforms_to_validator(
+    validator: Any, config: Any, file: str, key: Optional[str]
+) -> None:
+    errs = list(validator.iter_errors(config))
     if errs:
         raise SchemaValidationError(
             best_match(errs), file=file, key=key, count=len(errs)
@@ -320,10 +344,14 @@ def run_validation_rules(
 
 
 # Memoize the JSON Schema definitions.
+loaded_schema_file = None
 loaded_gs_schema = None
 loaded_sat_schema = None
 loaded_shared_constraint_set_schema = None
 
+# Memoize the compiled validators for each schema, so the schema itself is only checked once.
+loaded_validators: Dict[str, Any] = {}
+
 
 def load_schema(asset_type: str) -> Any:
     if asset_type == GROUND_STATION:
@@ -336,10 +364,25 @@ def load_schema(asset_type: str) -> Any:
         raise Exception(f"Unknown asset type {asset_type}")
 
 
+def load_validator(asset_type: str) -> Any:
+    if asset_type not in loaded_validators:
+        schema = load_schema(asset_type)
+        jsonschema.Draft7Validator.check_schema(schema)
+        loaded_validators[asset_type] = jsonschema.Draft7Validator(schema)  # type: ignore
+    return loaded_validators[asset_type]
+
+
+def load_schema_file() -> Any:
+    global loaded_schema_file
+    if not loaded_schema_file:
+        loaded_schema_file = load_yaml_file_fast(SCHEMA_FILE)
+    return loaded_schema_file
+
+
 def load_shared_constraint_set_schema() -> Any:
     global loaded_shared_constraint_set_schema
     if not loaded_shared_constraint_set_schema:
-        loaded_shared_constraint_set_schema = load_yaml_file(SCHEMA_FILE)[
+        loaded_shared_constraint_set_schema = load_schema_file()[
             "shared_separation_constraint_sets_schema"
         ]
     return loaded_shared_constraint_set_schema
@@ -348,12 +391,12 @@ def load_shared_constraint_set_schema() -> Any:
 def load_gs_schema() -> Any:
     global loaded_gs_schema
     if not loaded_gs_schema:
-        loaded_gs_schema = load_yaml_file(SCHEMA_FILE)["gs_schema"]
+        loaded_gs_schema = load_schema_file()["gs_schema"]
     return loaded_gs_schema
 
 
 def load_sat_schema() -> Any:
     global loaded_sat_schema
     if not loaded_sat_schema:
-        loaded_sat_schema = load_yaml_file(SCHEMA_FILE)["sat_schema"]
+        loaded_sat_schema = load_schema_file()["sat_schema"]
     return loaded_sat_schema
@@ -0,0 +1,19 @@
+from tabulate import tabulate
+
+from channel_tool.audit import simple_table
+
+
+def test_simple_table_matches_tabulate():
+    headers = ["Channel", "Reason"]
+    cases = [
+        [],
+        [["S_BAND_A", "Satellite denies ground station"], ["UHF", None]],
+        [["X_BAND_LONG_CHANNEL_NAME", "x"]],
+        [["S_BAND_A", "123"]],
+        [["A", "1,000"]],
+        [["A", "True"]],
+        [["S_BAND_A", "two\nlines"]],
+        [[" S_BAND_A", "padded "], ["UHF", "tab\tseparated"]],
+    ]
+    for rows in cases:
+        assert simple_table(rows, headers) == tabulate(rows, headers)
@@ -1,4 +1,22 @@
-from channel_tool.__main__ import merge, remove, str_to_bool, update
+import os
+from argparse import Namespace
+from copy import deepcopy
+
+import pytest
+
+from channel_tool.__main__ import (
+    EDITABLE_FIELDS,
+    apply_update,
+    merge,
+    modify,
+    remove,
+    schema_fields,
+    str_to_bool,
+    update,
+)
+from channel_tool.asset_config import CONFIG_CACHE
+from channel_tool.util import GROUND_STATION, dump_yaml_file, load_yaml_file
+from channel_tool.validation import load_validator
 
 
 def test_merge_lists_simple():
@@ -8,6 +26,34 @@ def test_merge_lists_simple():
     assert c == [1, 2, 3, 4, 5]
 
 
+def test_merge_lists_of_dicts():
+    a = [{"a": 1, "b": 2}, {"c": 3}]
+    b = [{"b": 2, "a": 1}, {"d": 4}]
+    c = merge(a, b)
+    assert c == [{"a": 1, "b": 2}, {"c": 3}, {"d": 4}]
+
+
+def test_merge_lists_of_equal_values_with_different_types():
+    a = [{"min_elevation_deg": 25, "downlink_rate_kbps": 100.0}, {"enabled": True}, 1]
+    b = [{"min_elevation_deg": 25, "downlink_rate_kbps": 100}, {"enabled": 1}, 1.0]
+    c = merge(a, b)
+    assert c == a
+
+
+def test_merge_lists_of_dicts_with_mixed_keys():
+    a = [{1: "a", "b": 2}]
+    b = [{"b": 2, 1: "a"}, {1: "c"}]
+    c = merge(a, b)
+    assert c == [{1: "a", "b": 2}, {1: "c"}]
+
+
+def test_merge_lists_of_strings_sorted():
+    a = ["b", "c"]
+    b = ["c", "a"]
+    c = merge(a, b)
+    assert c == ["a", "b", "c"]
+
+
 def test_merge_dicts_simple():
     a = {"a": 1, "b": 2, "c": 3}
     b = {"c": 4, "d": 5}
@@ -29,6 +75,23 @@ def test_merge_mixed_dicts_and_lists():
     assert c == {"a": [1, 2], "b": [1, 3], "d": [4]}
 
 
+def test_merge_dicts_replaces_strings():
+    a = {"a": "x", "b": ["x"]}
+    b = {"a": "y", "b": ["y"]}
+    c = merge(a, b)
+    assert c == {"a": "y", "b": ["x", "y"]}
+
+
+def test_merge_dicts_in_place():
+    a = {"a": {"a1": 1}}
+    b = {"a": {"a2": 1}}
+    c = merge(a, b)
+    assert a == {"a": {"a1": 1}}
+    d = merge(a, b, in_place=True)
+    assert d is a
+    assert a == c
+
+
 def test_remove_lists_simple():
     a = [1, 2, 3]
     b = [3, 4, 5]
@@ -78,6 +141,14 @@ def test_remove_mixed_dicts_and_lists_preserving_substructure():
     assert c == {"a": [2], "b": [3], "c": [{"c1": 3}, {"c2": 4}], "d": [4]}
 
 
+def test_remove_dicts_leaves_input_untouched():
+    a = {"a": {"a1": 1, "a2": 2}, "b": {"b1": 1}}
+    b = {"a": {"a2": 2}}
+    c = remove(a, b)
+    assert c == {"a": {"a1": 1}, "b": {"b1": 1}}
+    assert a == {"a": {"a1": 1, "a2": 2}, "b": {"b1": 1}}
+
+
 def test_remove_primitive_not_equal():
     a = 1
     b = 2
@@ -192,3 +263,63 @@ def test_update_list_of_dicts_predicate_two():
     c = update(a, b, p)
     # First one only matches one predicate, second one matches both. Update second only
     assert c == [{"a": 1, "b": 2, "c": 3}, {"a": 2, "b": 4, "c": 4}]
+
+
+def test_editable_fields_are_in_schema():
+    assert set(EDITABLE_FIELDS) <= schema_fields()
+
+
+def test_modify_leaves_original_untouched():
+    cdef = {
+        "enabled": False,
+        "allowed_license_countries": ["US"],
+        "link_profile": [{"min_elevation_deg": 10, "downlink_rate_kbps": 100}],
+    }
+    original = deepcopy(cdef)
+    changes = {
+        "overwrite": {"enabled": True},
+        "merge": {"allowed_license_countries": ["CA"]},
+        "remove": {"allowed_license_countries": ["US"]},
+        "update": {"link_profile": [{"downlink_rate_kbps": 200}]},
+    }
+    for mode, fields in changes.items():
+        args = Namespace(mode=mode, predicate=None, comment=None, **fields)
+        assert modify(cdef, args) != original
+        assert cdef == original
+
+
+def delete_unless_bbgs(asset, channel, existing):
+    if asset == "bbgs":
+        raise ValueError("Failed on bbgs")
+    return None
+
+
+@pytest.mark.parametrize("fail_fast", [False, True])
+def test_apply_update_stops_at_failing_asset(tmp_path, monkeypatch, capsys, fail_fast):
+    load_validator(GROUND_STATION)
+    monkeypatch.chdir(tmp_path)
+    # Force the updates out to worker processes, even on a single CPU.
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    assets = ["aags", "bbgs", "ccgs"]
+    os.makedirs(os.path.join("staging", "gs"))
+    for asset in assets:
+        CONFIG_CACHE.pop(("staging", asset), None)
+        dump_yaml_file(
+            {"X": {"enabled": True}, "Y": {"enabled": True}}, f"staging/gs/{asset}.yaml"
+        )
+
+    with pytest.raises(ValueError, match="Failed on bbgs"):
+        apply_update(
+            "staging", assets, ["X"], delete_unless_bbgs, yes=True, fail_fast=fail_fast
+        )
+
+    # Assets before the failure are updated, the ones after it are left alone.
+    assert load_yaml_file("staging/gs/aags.yaml") == {"Y": {"enabled": True}}
+    assert load_yaml_file("staging/gs/ccgs.yaml") == {
+        "X": {"enabled": True},
+        "Y": {"enabled": True},
+    }
+    out = capsys.readouterr().out
+    assert "Deleted X definition for aags." in out
+    assert "Failed on bbgs" in out
+    assert "ccgs" not in out
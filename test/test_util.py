@@ -1,4 +1,19 @@
-from channel_tool.util import lookup, set_path
+import os
+import re
+
+import pytest
+from ruamel.yaml import YAMLError
+
+from channel_tool.util import (
+    copy_yaml,
+    dump_yaml_string,
+    format_diff,
+    load_yaml_file,
+    load_yaml_file_fast,
+    load_yaml_value,
+    lookup,
+    set_path,
+)
 
 
 def test_lookup():
@@ -26,3 +41,67 @@ def test_set_path():
     }
 
     assert set_path("foo.bar", {}, True) == {"foo": {"bar": True}}
+
+
+def test_dump_yaml_string_expands_shared_structures():
+    shared = {"foo": [1, 2]}
+    out = dump_yaml_string({"bar": shared, "baz": shared})
+    assert "&" not in out and "*" not in out
+    assert out.count("foo:") == 2
+
+
+def test_format_diff_only_shows_changed_fields():
+    existing = {"enabled": False, "legal": True, "link_profile": [{"a": 1}]}
+    new = {"enabled": True, "legal": True, "link_profile": [{"a": 1}]}
+    diff = format_diff(existing, new)
+    assert "enabled" in diff
+    assert "legal" not in diff and "link_profile" not in diff
+    assert "legal" in format_diff(existing, new, context=None)
+
+
+def test_format_diff_shows_added_and_removed_null_fields():
+    existing = {"enabled": True, "satellite_constraints": None}
+    new = {"enabled": True, "ground_station_constraints": None}
+    diff = format_diff(existing, new)
+    assert "-satellite_constraints:" in diff
+    assert "+ground_station_constraints:" in diff
+    assert "enabled" not in diff
+
+
+def test_copy_yaml():
+    obj = {"foo": [{"bar": 1}], "baz": "quux"}
+    copied = copy_yaml(obj)
+    assert copied == obj
+    assert copied["foo"] is not obj["foo"] and copied["foo"][0] is not obj["foo"][0]
+
+    commented = load_yaml_value("foo: [1, 2]  # comment\n")
+    assert dump_yaml_string(copy_yaml(commented)) == dump_yaml_string(commented)
+
+
+def test_load_yaml_file_cache_sees_changes(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "config.yaml"
+    path.write_text("foo: 1  # comment\n")
+    assert load_yaml_file(str(path)) == {"foo": 1}
+    assert load_yaml_file_fast(str(path)) == {"foo": 1}
+    cached = load_yaml_file(str(path))
+    assert dump_yaml_string(cached) == "foo: 1  # comment\n"
+
+    path.write_text("foo: 22\n")
+    assert load_yaml_file(str(path)) == {"foo": 22}
+    assert load_yaml_file_fast(str(path)) == {"foo": 22}
+
+    # Rewriting a file with the same size and modification time is noticed too.
+    stat = path.stat()
+    path.write_text("foo: 33\n")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert load_yaml_file(str(path)) == {"foo": 33}
+    assert load_yaml_file_fast(str(path)) == {"foo": 33}
+
+
+def test_load_yaml_file_errors_name_the_file(tmp_path):
+    path = tmp_path / "broken.yaml"
+    path.write_text("foo: [1, 2\n")
+    for load in (load_yaml_file, load_yaml_file_fast):
+        with pytest.raises(YAMLError, match=re.escape(str(path))):
+            load(str(path))